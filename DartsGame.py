@@ -14,8 +14,10 @@ class DartsGame:
         self.checkout_attempts = 0
         self.checkouts_hit = 0
         self.legs_won = 0
+        self.version = 0  # bumped on every change, keys cached page fragments
 
     def throw(self, dart_input, coords=None):
+        self.version += 1
         is_180 = False
 
 
@@ -75,6 +77,7 @@ class DartsGame:
         self.current_turn = []
 
     def end_turn(self):
+        self.version += 1
         if self.current_turn:
             self.turns.append(self.current_turn)
         self.current_turn = []
@@ -82,6 +85,7 @@ class DartsGame:
 
 
     def reset(self):
+        self.version += 1
         self.score = self.start_score
         self.turn_darts = []
         self.turn_dart_score = self.start_score
@@ -93,6 +97,7 @@ class DartsGame:
         self.current_turn = []
 
     def undo_last_dart(self):
+        self.version += 1
         if self.current_turn:
             dart= self.current_turn.pop()
             self.score += dart['score']
@@ -111,6 +116,7 @@ class DartsGame:
             self.current_turn = last_turn
 
     def undo_last_turn(self):
+        self.version += 1
         if not self.turns:
             return
 
@@ -160,9 +166,42 @@ class DartsGame:
             "average": self.average(),
             "highest_score":self.highest_score(),
             "total_darts_thrown": self.total_darts_thrown,
-            "is_winner": self.score == 0
+            "is_winner": self.score == 0,
+            "legs_won": self.legs_won,
+            # Also the last entry of turns; exported so a resume reopens exactly this visit
+            "current_turn": self.current_turn.copy()
         }
 
+    def export_state(self):
+        """Complete state for snapshots; from_state() rebuilds the game exactly."""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_state(cls, state):
+        game = cls(state["name"], state["start_score"])
+        game.__dict__.update(state)
+        game.dart_coords = [tuple(c) for c in game.dart_coords]
+        return game
+
+    @classmethod
+    def from_export(cls, data):
+        """
+        Rebuilds a game from export_session() output. Exports fold the open turn into
+        turns; the turn named by current_turn is reopened (older exports, without it,
+        resume between visits). Dart positions aren't exported and come back empty.
+        """
+        game = cls(data.get("player", "Player"), data.get("start_score", 501))
+        game.turns = [list(turn) for turn in data.get("turns", [])]
+        # Bust turns score 0, so every dart counts
+        game.score = game.start_score - sum(d["score"] for turn in game.turns for d in turn)
+        if data.get("current_turn") and game.turns:
+            game.current_turn = game.turns.pop()
+        game.turn_start_score = game.score + game.get_turn_score()
+        game.checkout_attempts = data.get("checkout_attempts", 0)
+        game.checkouts_hit = data.get("checkouts_hit", 0)
+        game.legs_won = data.get("legs_won", 1 if data.get("is_winner") else 0)
+        return game
+
 
     @property
     def total_darts_thrown(self):
@@ -20,10 +20,12 @@ class Practice20Game:
         self.dart_coords = []
         self.game_type = "practice_20"
         self.legs_won = 0
+        self.version = 0  # bumped on every change, keys cached page fragments
         self.checkouts_hit = 0
         self.checkout_attempts = 0
 
     def throw(self, dart_input, coords=None):
+        self.version += 1
         if coords:
             self.dart_coords.append(coords)
 
@@ -62,6 +64,7 @@ class Practice20Game:
 
 
     def reset(self):
+        self.version += 1
         self.score = 0
         self.turn_darts = []
         self.history = []
@@ -70,6 +73,7 @@ class Practice20Game:
         self.stats = {"20": 0, "T20": 0, "5": 0, "1": 0, "12": 0, "18": 0}
 
     def undo(self):
+        self.version += 1
         if self.history:
             self.score = self.history.pop()
             
@@ -95,6 +99,7 @@ class Practice20Game:
                 self.dart_coords.pop()
 
     def end_turn(self):
+        self.version += 1
         self.turn_darts = []
 
     def average(self):
@@ -120,9 +125,36 @@ class Practice20Game:
             "stats": self.stats,
             "stats_percentages": self.stats_percentages,
             "total_darts_thrown": self.total_darts_thrown,
-            "average": self.average()
+            "average": self.average(),
+            "max_darts": self.max_darts,
+            "legs_won": self.legs_won
         }
 
+    def export_state(self):
+        """Complete state for snapshots; from_state() rebuilds the game exactly."""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_state(cls, state):
+        game = cls(state["name"], max_darts=state["max_darts"])
+        game.__dict__.update(state)
+        game.dart_coords = [tuple(c) for c in game.dart_coords]
+        return game
+
+    @classmethod
+    def from_export(cls, data):
+        """
+        Rebuilds a game from export_session() output. Exports only carry totals, so
+        undo can't take back darts thrown before the export.
+        """
+        game = cls(data.get("player", "Player"), max_darts=data.get("max_darts", 99))
+        game.score = data.get("score", 0)
+        game.stats.update(data.get("stats", {}))
+        # total_darts_thrown counts the undo history; undoing one of these only drops the dart
+        game.history = [game.score] * data.get("total_darts_thrown", 0)
+        game.legs_won = data.get("legs_won", 0)
+        return game
+
     @property
     def total_darts_thrown(self):
         return len(self.history)
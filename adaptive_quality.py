@@ -0,0 +1,93 @@
+from collections import deque
+
+# Quality levels, best first: (capture width, capture height), processing scale,
+# run detection every n frames. All 16:9 so calibrations rescale uniformly.
+LEVELS = [
+    ((1920, 1080), 1.0, 1),
+    ((1280, 720), 1.0, 1),
+    ((1280, 720), 0.75, 1),
+    ((1280, 720), 0.5, 1),
+    ((640, 360), 1.0, 1),
+    ((640, 360), 0.75, 2),
+    ((640, 360), 0.5, 3),
+]
+DEFAULT_LEVEL = 1
+
+
+class QualityController:
+    """
+    Picks capture resolution, processing downscale and detection frequency to hold a
+    frame rate and latency budget. Feed it the processing time of each frame: it steps
+    down a level as soon as a window of frames runs over budget, and steps back up only
+    after a longer stretch well under it. Each time a step up fails straight away, the
+    wait before the next attempt doubles, so it settles instead of oscillating.
+    """
+
+    def __init__(self, target_fps=30, latency_budget=0.1, headroom=0.8, window=30, levels=LEVELS,
+                 start=DEFAULT_LEVEL):
+        self.target_fps = target_fps
+        # Per-frame processing has to leave room for capture and display
+        self.budget = min(headroom / target_fps, latency_budget)
+        self.window = window
+        # Skipping frames between detections adds up to (n - 1) frames of delay
+        self.levels = [level for level in levels if (level[2] - 1) / target_fps <= latency_budget]
+        self.index = min(start, len(self.levels) - 1)
+        self.samples = deque(maxlen=window)
+        self.frames_at_level = 0
+        self.step_up_after = window * 3
+        self.stepped_up = False
+        self.last_mean = 0.0
+        self.changes = 0
+
+    @property
+    def capture_size(self):
+        return self.levels[self.index][0]
+
+    @property
+    def scale(self):
+        return self.levels[self.index][1]
+
+    @property
+    def detect_every(self):
+        return self.levels[self.index][2]
+
+    def should_detect(self, frame_no):
+        return frame_no % self.detect_every == 0
+
+    @property
+    def mean_ms(self):
+        """Mean processing time over the current window (or the last full one, just after a change)."""
+        return (sum(self.samples) / len(self.samples) if self.samples else self.last_mean) * 1000
+
+    def update(self, elapsed):
+        """Records one frame's processing time in seconds. Returns True if the level changed."""
+        self.samples.append(elapsed)
+        self.frames_at_level += 1
+        if len(self.samples) < self.window:
+            return False
+
+        mean = sum(self.samples) / len(self.samples)
+        if mean > self.budget and self.index < len(self.levels) - 1:
+            if self.stepped_up:
+                self.step_up_after *= 2
+            return self._set(self.index + 1, mean)
+        if mean < self.budget * 0.5 and self.index > 0 and self.frames_at_level >= self.step_up_after:
+            return self._set(self.index - 1, mean)
+        if self.frames_at_level >= self.window:
+            # This level has held for a full window, so a step up that got here worked
+            self.stepped_up = False
+        return False
+
+    def _set(self, index, mean):
+        self.stepped_up = index < self.index
+        self.index = index
+        self.last_mean = mean
+        self.samples.clear()
+        self.frames_at_level = 0
+        self.changes += 1
+        return True
+
+    def report(self):
+        (width, height), scale, every = self.levels[self.index]
+        return (f"Quality {self.index}: {width}x{height} x{scale:g}, detect 1/{every} | "
+                f"{self.mean_ms:.1f}/{self.budget * 1000:.0f} ms")
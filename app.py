@@ -1,14 +1,45 @@
-from flask import Flask, render_template, request, redirect, url_for, Response, session
+from flask import (Flask, render_template, request, redirect, url_for, Response, session, jsonify, make_response,
+                   after_this_request)
+import atexit
+import hashlib
 import json
+import threading
+import time
 import uuid
 from DartsGame import DartsGame
 from Practice20Game import Practice20Game
 from scoring_logic import get_coords_from_score
+from player_history import PlayerHistory, match_leg_stats
+from frame_scoring import (offload, decode_image, calibrate_frame, score_frame, board_roi, parse_roi, view_calibration,
+                           view_scale, view_to_frame, convert_background, FULL_FRAME, ROI_SIZE, DART_MIN_AREA)
+import http_cache
+import metrics
+import session_store
+import template_cache
+from tournament import FORMATS, Tournament
 import os
 
 app = Flask(__name__)
 app.secret_key = "change_this_to_a_secure_random_key_for_hosting"
 games = {}
+tournaments = {}
+_history = None
+http_cache.init_app(app)
+metrics.init_app(app, games)
+template_cache.init_app(app)
+
+
+def get_history():
+    """The history database, opened (and created) when the first leg is recorded."""
+    global _history
+    if _history is None:
+        _history = PlayerHistory()
+    return _history
+
+
+# Part of every page ETag, so a restarted server (possibly with new templates)
+# never answers 304 for a page rendered by the old one
+_etag_salt = uuid.uuid4().hex[:8]
 
 
 class Match:
@@ -17,17 +48,104 @@ class Match:
         self.current_player_index = 0
         self.best_of = int(best_of)
         self.starting_player_index = 0
+        self.leg_recorded = False
+        self.unsaved_legs = []  # (leg stats, history key) waiting for save_legs()
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.version = 0
+        self.token = uuid.uuid4().hex[:12]
+        self.calibration = None
+        self.background = None
+        self.view = None  # (roi, size) of the frames background was taken from
+        # Set for tournament matches: called with (match, leg stats) when a leg is won
+        self.on_leg_won = None
+        self.tournament = None
+        self.board = None
+        # Latest rendering of each {% cache %} fragment of game.html
+        self.fragments = {}
 
     @property
     def current_player(self):
         return self.players[self.current_player_index]
 
+    def touch(self):
+        """Bumps the version and wakes anything streaming this match."""
+        with self.lock:
+            self.version += 1
+            self.changed.notify_all()
+
+    def etag(self, *parts):
+        """Validator for a page rendered from this match (and parts); changes whenever the match does."""
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:8]
+        return f"{_etag_salt}-{self.token}-{self.version}-{digest}"
+
+    def throw(self, dart, coords=None):
+        """Throws for the current player and applies the match rules. Returns (result, is_180)."""
+        game = self.current_player
+        result, is_180 = game.throw(dart, coords=coords)
+        metrics.count("throws")
+        if result in ("BUST", "NO_DOUBLE"):
+            metrics.count("busts")
+        if result == "WIN":
+            game.legs_won += 1
+            # The deciding leg is final at once; earlier legs can still be undone until the next leg starts
+            if self.is_over:
+                self._complete_leg()
+        elif result in ("TURN_OVER", "BUST", "NO_DOUBLE"):
+            self.next_player()
+        return result, is_180
+
+    def snapshot(self):
+        """Scoreboard state for live viewers."""
+        return {
+            "version": self.version,
+            "current_player_index": self.current_player_index,
+            "is_over": self.is_over,
+            "players": [
+                {
+                    "name": p.name,
+                    "score": p.score,
+                    "legs_won": p.legs_won,
+                    "average": p.average(),
+                    "darts": p.total_darts_thrown
+                }
+                for p in self.players
+            ]
+        }
+
+    def undo(self):
+        """Takes back the current player's last dart, reopening a won leg. A finished match is final."""
+        if self.is_over:
+            return False
+        game = self.current_player
+        if hasattr(game, "undo_last_dart"):
+            if game.score == 0:
+                game.legs_won -= 1
+            game.undo_last_dart()
+        elif hasattr(game, "undo"):
+            game.undo()
+        return True
+
+    def _complete_leg(self):
+        """
+        Queues the won leg's stats for the history (and tournament), once. They are
+        written by save_legs() after the match lock is released.
+        """
+        if self.leg_recorded:
+            return
+        leg_no = sum(p.legs_won for p in self.players)
+        self.unsaved_legs.append((match_leg_stats(self), f"match:{self.token}:{leg_no}"))
+        self.leg_recorded = True
+
     def next_player(self):
         self.current_player_index = (self.current_player_index + 1) % len(self.players)
 
     def next_leg(self):
+        if any(p.score == 0 for p in self.players if p.game_type == "x01"):
+            self._complete_leg()
         self.starting_player_index = (self.starting_player_index + 1) % len(self.players)
         self.current_player_index = self.starting_player_index
+        self.leg_recorded = False
         for p in self.players:
             p.reset()
 
@@ -41,12 +159,119 @@ class Match:
     def export_session(self):
         """Export the full multiplayer session as a dict."""
         return {
+            "match_id": self.token,
             "players": [player.export_session() for player in self.players],
             "current_player_index": self.current_player_index,
             "best_of": self.best_of,
             "starting_player_index": self.starting_player_index
         }
 
+    def export_state(self):
+        """Complete match state for snapshots. Camera calibration isn't kept; the next frame recalibrates."""
+        return {
+            "players": [player.export_state() for player in self.players],
+            "current_player_index": self.current_player_index,
+            "best_of": self.best_of,
+            "starting_player_index": self.starting_player_index,
+            "leg_recorded": self.leg_recorded
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        players = [GAME_CLASSES[p["game_type"]].from_state(p) for p in state["players"]]
+        match = cls(players, state["best_of"])
+        match.current_player_index = state["current_player_index"]
+        match.starting_player_index = state["starting_player_index"]
+        match.leg_recorded = state["leg_recorded"]
+        return match
+
+    @classmethod
+    def from_export(cls, data):
+        """Rebuilds a match from export_session() output (e.g. a downloaded session file)."""
+        current = data.get("current_player_index", 0)
+        players = []
+        for p in data["players"]:
+            if p.get("game_type") == "practice_20":
+                players.append(Practice20Game.from_export(p))
+            else:
+                players.append(DartsGame.from_export(p))
+        if not players:
+            raise ValueError("The export has no players")
+        match = cls(players, data.get("best_of", 1))
+        match.current_player_index = current
+        match.starting_player_index = data.get("starting_player_index", 0)
+        # Only the deciding leg is recorded when it is won; an earlier one is recorded by next_leg
+        match.leg_recorded = match.is_over
+        return match
+
+
+GAME_CLASSES = {"x01": DartsGame, "practice_20": Practice20Game}
+
+# Live matches are snapshotted here and resumed on startup; set to "" to turn off
+SNAPSHOT_PATH = os.environ.get("DARTS_SNAPSHOT", "darts_snapshot.json")
+snapshotter = None
+
+
+def start_snapshots(path=SNAPSHOT_PATH):
+    """
+    Resumes the matches in the snapshot file and starts snapshotting live matches
+    to it. Called by the server entry points rather than on import: the file holds
+    one process's matches, so only a single serving process may own it.
+    """
+    global snapshotter
+    if not path or snapshotter is not None:
+        return
+    for game_id, state in session_store.read_snapshot(path).items():
+        games[game_id] = Match.from_state(state)
+    snapshotter = session_store.Snapshotter(games, path)
+    snapshotter.start()
+    atexit.register(snapshotter.stop)
+
+
+def with_snapshots():
+    """The app with snapshots on, for a single-worker gunicorn: gunicorn -k gevent 'app:with_snapshots()'."""
+    start_snapshots()
+    return app
+
+
+def save_legs(match):
+    """
+    Writes the legs match has queued to the history and hands them to its tournament.
+    Runs outside the match lock, with the SQLite commit on a worker thread, so a won
+    leg doesn't hold up the match's streams and snapshots or the gevent hub.
+    """
+    with match.lock:
+        pending, match.unsaved_legs = match.unsaved_legs, []
+    for legs, source in pending:
+        with metrics.timed("db"):
+            offload(get_history().record_legs, legs, None, source)
+        if match.on_leg_won is not None:
+            match.on_leg_won(match, legs)
+
+
+def _save_legs_after(match):
+    """Runs save_legs(match) once the view has returned, and so released the match lock."""
+    @after_this_request
+    def save(response):
+        save_legs(match)
+        return response
+
+
+def add_match(match, game_id=None):
+    """Puts a newly started match in games (under game_id, or a new id) and counts it. Returns the id."""
+    game_id = game_id or str(uuid.uuid4())
+    games[game_id] = match
+    metrics.count("matches")
+    return game_id
+
+
+def _page_response(body, etag, status=200):
+    """A page the browser may keep but must revalidate (by ETag) before every use."""
+    response = make_response(body, status)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 
 @app.route("/", methods=["GET", "POST"])
 def start():
@@ -70,15 +295,24 @@ def start():
             else:
                 players.append(DartsGame(name, start_score))
         
-        new_match = Match(players, best_of)
-        game_id = str(uuid.uuid4())
-        games[game_id] = new_match
-        session["game_id"] = game_id
+        session["game_id"] = add_match(Match(players, best_of))
         
         return redirect(url_for("game_view"))
     return render_template("start.html")
 
 
+@app.route("/resume", methods=["POST"])
+def resume():
+    """Starts a match from a downloaded session export, where it left off."""
+    upload = request.files.get("session")
+    try:
+        match = Match.from_export(json.load(upload))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return render_template("start.html", error="That file isn't an exported match."), 400
+    session["game_id"] = add_match(match)
+    return redirect(url_for("game_view"))
+
+
 @app.route("/game", methods=["GET", "POST"])
 def game_view():
     game_id = session.get("game_id")
@@ -87,82 +321,95 @@ def game_view():
     if not match:
         return redirect(url_for("start"))
 
+    # Serialise everything that touches this match, including rendering, so a
+    # double tap can't interleave inside throw/next_player and the page is drawn
+    # from a consistent state. Other matches have their own lock.
     if request.method == "POST":
-        game = match.current_player
-        action = request.form.get("action")
+        _save_legs_after(match)
+    with match.lock:
+        if request.method == "POST":
+            game = match.current_player
+            action = request.form.get("action")
+            # Only actions that change the match bump its version (before the change;
+            # stream listeners only wake once the lock is released)
         
-        if action == "next_turn":
-            game.end_turn()
-            match.next_player()
-            return redirect(url_for("game_view"))
+            if action == "next_turn":
+                match.touch()
+                game.end_turn()
+                match.next_player()
+                return redirect(url_for("game_view"))
 
-        elif action == "next_leg":
-            match.next_leg()
-            return redirect(url_for("game_view"))
+            elif action == "next_leg":
+                match.touch()
+                match.next_leg()
+                return redirect(url_for("game_view"))
             
-        elif action == "throw":
-            dart = request.form.get("dart")
-            coords = get_coords_from_score(dart)
+            elif action == "throw":
+                dart = request.form.get("dart")
+                coords = get_coords_from_score(dart)
 
-            result, is_180 = game.throw(dart, coords=coords)
+                match.touch()
+                result, is_180 = match.throw(dart, coords=coords)
 
-            if result == "TURN_OVER":
-                match.next_player()
-                return redirect(
-                    url_for(
-                        "game_view",
-                        transition="true",
-                        one80="true" if is_180 else None
+                if result == "TURN_OVER":
+                    return redirect(
+                        url_for(
+                            "game_view",
+                            transition="true",
+                            one80="true" if is_180 else None
+                        )
                     )
-                )
 
-            status = ""
-            if result == "WIN":
-                game.legs_won += 1
-                status = "🎯 GAME SHOT!" if match.is_over else "🎯 LEG WON!"
-            elif result == "BUST" or result == "NO_DOUBLE":
-                match.next_player()
-                return redirect(url_for(
-                    "game_view", 
-                    transition="true", 
-                    bust="BUST!" if result == "BUST" else "No Double!"
-                ))
+                status = ""
+                if result == "WIN":
+                    status = "🎯 GAME SHOT!" if match.is_over else "🎯 LEG WON!"
+                elif result == "BUST" or result == "NO_DOUBLE":
+                    return redirect(url_for(
+                        "game_view", 
+                        transition="true", 
+                        bust="BUST!" if result == "BUST" else "No Double!"
+                    ))
 
-            return redirect(url_for("game_view", status=status if status else None))
+                return redirect(url_for("game_view", status=status if status else None))
 
 
-        elif action == "undo":
-            if hasattr(game, "undo_last_dart"):
-                game.undo_last_dart()
-            elif hasattr(game, "undo"):
-                game.undo()
-            return redirect(url_for("game_view"))
+            elif action == "undo":
+                match.touch()
+                metrics.count("undos")
+                match.undo()
+                return redirect(url_for("game_view"))
 
-        elif action == "export":
-            if hasattr(match, "export_session"):
-                data = match.export_session()
-                return Response(
-                    json.dumps(data, indent=2),
-                    mimetype="application/json",
-                    headers={"Content-Disposition": 'attachment;filename="darts_match_session.json"'}
-                )
-            return redirect(url_for("game_view"))
+            elif action == "export":
+                if hasattr(match, "export_session"):
+                    data = match.export_session()
+                    return Response(
+                        json.dumps(data, indent=2),
+                        mimetype="application/json",
+                        headers={"Content-Disposition": 'attachment;filename="darts_match_session.json"'}
+                    )
+                return redirect(url_for("game_view"))
+
+        # Every change goes through a POST that bumps the version, so an unchanged
+        # version means the browser's copy is still current
+        etag = match.etag("game", sorted(request.args.items()))
+        if http_cache.not_modified(etag):
+            return _page_response("", etag, 304)
 
-    game = match.current_player
-    status = request.args.get("status", "")
-    transition = request.args.get("transition")
-    one80 = request.args.get("one80")
-    bust = request.args.get("bust")
-    return render_template(
-        "game.html",
-        match=match,
-        game=game,
-        status=status,
-        suggestion=game.checkout_suggestion(),
-        transition=transition,
-        one80=one80,
-        bust=bust
-    )
+        game = match.current_player
+        status = request.args.get("status", "")
+        transition = request.args.get("transition")
+        one80 = request.args.get("one80")
+        bust = request.args.get("bust")
+        return _page_response(render_template(
+            "game.html",
+            match=match,
+            game=game,
+            status=status,
+            suggestion=game.checkout_suggestion(),
+            transition=transition,
+            one80=one80,
+            bust=bust
+        ), etag)
 
 
 @app.route("/restart")
@@ -170,26 +417,235 @@ def restart():
     game_id = session.get("game_id")
     match = games.get(game_id)
     
-    if match:
-        # Re-create players with same names and start score
-        new_players = []
-        for p in match.players:
-            if p.game_type == "practice_20":
-                new_players.append(Practice20Game(p.name, max_darts=p.max_darts))
-            else:
-                new_players.append(DartsGame(p.name, start_score=p.start_score))
-        games[game_id] = Match(new_players, match.best_of)
+    if match and match.tournament is None:
+        with match.lock:
+            # Re-create players with same names and start score
+            new_players = []
+            for p in match.players:
+                if p.game_type == "practice_20":
+                    new_players.append(Practice20Game(p.name, max_darts=p.max_darts))
+                else:
+                    new_players.append(DartsGame(p.name, start_score=p.start_score))
+            new_match = Match(new_players, match.best_of)
+            new_match.calibration = match.calibration
+            new_match.background = match.background
+            new_match.view = match.view
+            add_match(new_match, game_id)
+            match.touch()
+    return redirect(url_for("game_view"))
+
+
+def start_tournament_match(tournament, fixture):
+    """Tournament.start_match: puts a fixture's match in games, reporting its legs back."""
+    match = Match([DartsGame(name, tournament.start_score) for name in fixture.players], tournament.best_of)
+    # A replayed fixture starts from the legs already won
+    for p in match.players:
+        p.legs_won = fixture.legs.get(p.name, 0)
+    match.tournament = tournament.id
+    match.board = fixture.board
+    match.on_leg_won = lambda m, legs: tournament.record_leg(fixture.id, legs)
+    return add_match(match)
+
+
+@app.route("/tournament", methods=["GET", "POST"])
+def tournament_new():
+    if request.method == "POST":
+        names_input = request.form.get("names", "")
+        names = [n.strip() for n in names_input.replace("\r", ",").replace("\n", ",").split(",") if n.strip()]
+        try:
+            tournament = Tournament(
+                request.form.get("name", "").strip() or "League Night",
+                names,
+                int(request.form.get("boards", 1)),
+                start_tournament_match,
+                fmt=request.form.get("format", "round_robin"),
+                best_of=int(request.form.get("best_of", 1)),
+                start_score=int(request.form.get("start_score", 501)),
+            )
+        except ValueError as e:
+            return render_template("tournament_new.html", formats=FORMATS, error=str(e)), 400
+        tournaments[tournament.id] = tournament
+        tournament.schedule()
+        return redirect(url_for("tournament_view", tid=tournament.id))
+    return render_template("tournament_new.html", formats=FORMATS)
+
+
+@app.route("/tournament/<tid>")
+def tournament_view(tid):
+    tournament = tournaments.get(tid)
+    if tournament is None:
+        return redirect(url_for("tournament_new"))
+    with tournament.lock:
+        live = [(board, fixture, games.get(fixture.game_id) if fixture else None)
+                for board, fixture in enumerate(tournament.boards)]
+        # Live scores change with every throw, so the matches on the boards are part of the ETag
+        etag = hashlib.sha1(repr((_etag_salt, tid, tournament.version,
+                                  [m.version for _, _, m in live if m])).encode()).hexdigest()[:16]
+        if http_cache.not_modified(etag):
+            return _page_response("", etag, 304)
+        return _page_response(render_template("tournament.html", tournament=tournament, live=live), etag)
+
+
+@app.route("/tournament/<tid>/board/<int:board>")
+def tournament_board(tid, board):
+    """Points this browser at whatever match is on the board now."""
+    tournament = tournaments.get(tid)
+    if tournament is None or not 0 <= board < len(tournament.boards):
+        return redirect(url_for("tournament_new"))
+    fixture = tournament.boards[board]
+    if fixture is not None and fixture.game_id not in games:
+        # Its match is gone (e.g. the server restarted): requeue the fixture and show the dashboard
+        tournament.abandon(fixture.id)
+        fixture = None
+    if fixture is None:
+        return redirect(url_for("tournament_view", tid=tid))
+    session["game_id"] = fixture.game_id
     return redirect(url_for("game_view"))
 
 
+@app.route("/camera")
+def camera_view():
+    match = games.get(session.get("game_id"))
+    if not match:
+        return redirect(url_for("start"))
+    with match.lock:
+        etag = match.etag("camera", sorted(request.args.items()))
+        if http_cache.not_modified(etag):
+            return _page_response("", etag, 304)
+        roi = board_roi(match.calibration) if match.calibration else None
+        return _page_response(render_template("camera_game.html", match=match, game=match.current_player,
+                                              roi=roi, roi_size=ROI_SIZE), etag)
+
+
+@app.route("/process_frame", methods=["POST"])
+def process_frame():
+    """
+    Scores a camera frame. Accepts JSON {"image": <data URL>, "reset": bool, "roi": [x, y, w, h]}
+    or a raw image body with ?reset=true / ?roi=x,y,w,h. The first frame (or a reset)
+    must be a full frame: it calibrates the board and becomes the background. The
+    response then carries the board's roi (fractions of the frame) and roi_size, and
+    later uploads can be just that crop, downscaled. Each frame is diffed against the
+    previous one to find the new dart.
+    Decoding and detection run on the frame worker pool, off the request thread.
+    The client may change its upload size or crop between frames (it adapts the size
+    to its latency budget); the background is converted to match. Responses include
+    processing_ms, and detected darts are reported in full-frame pixels.
+    """
+    started = time.perf_counter()
+    match = games.get(session.get("game_id"))
+    if not match:
+        return jsonify(error="No active game"), 404
+
+    if request.is_json:
+        payload = request.get_json()
+        data = payload.get("image", "")
+        reset = bool(payload.get("reset"))
+        roi = payload.get("roi")
+    else:
+        data = request.get_data()
+        reset = request.args.get("reset") == "true"
+        roi = request.args.get("roi")
+
+    try:
+        roi = parse_roi(roi) if roi else FULL_FRAME
+        with metrics.timed("frame"):
+            frame = offload(decode_image, data)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    if match.calibration is None or reset:
+        if roi != FULL_FRAME:
+            # e.g. the server restarted; the client resends a full frame
+            return jsonify(error="The board isn't calibrated yet. Analyze again to calibrate.", roi=None)
+        with metrics.timed("frame"):
+            calibration = offload(calibrate_frame, frame)
+        if calibration is None:
+            return jsonify(error="Could not find the board. Check lighting and camera angle.", roi=None)
+        with match.lock:
+            match.calibration = calibration
+            match.background = frame
+            match.view = (FULL_FRAME, calibration["frame_size"])
+        return jsonify(calibrated=True, message="Board calibrated. Throw a dart, then analyze.",
+                       roi=board_roi(calibration), roi_size=ROI_SIZE,
+                       processing_ms=(time.perf_counter() - started) * 1000)
+
+    view = (roi, (frame.shape[1], frame.shape[0]))
+    try:
+        calibration = view_calibration(match.calibration, view)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if view != match.view:
+        with metrics.timed("frame"):
+            background = offload(convert_background, match.background, match.view, view)
+        with match.lock:
+            match.background = background
+            match.view = view
+
+    # Dart areas shrink with the square of the downscale
+    min_area = max(10, DART_MIN_AREA * view_scale(match.calibration, view)[0] ** 2)
+    with metrics.timed("frame"):
+        score, point = offload(score_frame, frame, match.background, calibration, min_area)
+    if score is None:
+        return jsonify(error="No dart detected", roi=board_roi(match.calibration), roi_size=ROI_SIZE)
+
+    cx, cy = calibration["center"]
+    coords = ((point[0] - cx) / calibration["board_radius"], (point[1] - cy) / calibration["board_radius"])
+
+    _save_legs_after(match)
+    with match.lock:
+        match.touch()
+        match.background = frame
+        game = match.current_player
+        result, is_180 = match.throw(score, coords=coords)
+        return jsonify(score=score, result=result, one80=is_180, new_score=game.score,
+                       point=view_to_frame(match.calibration, view, point),
+                       roi=board_roi(match.calibration), roi_size=ROI_SIZE,
+                       processing_ms=(time.perf_counter() - started) * 1000)
+
+
+@app.route("/stream")
+def stream():
+    """Server-sent events with the scoreboard, pushed whenever the match changes."""
+    game_id = session.get("game_id")
+    if game_id not in games:
+        return Response(status=404)
+
+    def events():
+        version = None
+        while True:
+            match = games.get(game_id)
+            if match is None:
+                yield "event: end\ndata: {}\n\n"
+                return
+            with match.lock:
+                if match.version == version:
+                    match.changed.wait(timeout=15)
+                replaced = games.get(game_id) is not match
+                data = None if match.version == version or replaced else match.snapshot()
+            if replaced:
+                continue
+            if data is None:
+                yield ": keepalive\n\n"
+                continue
+            version = data["version"]
+            yield f"data: {json.dumps(data)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route("/quit")
 def quit():
     game_id = session.get("game_id")
     if game_id and game_id in games:
-        del games[game_id]
+        if games[game_id].tournament is not None:
+            # The fixture would keep its board; tournament matches are played out
+            return redirect(url_for("game_view"))
+        games.pop(game_id).touch()
     session.pop("game_id", None)
     return "<html><body style='background-color: #0f172a; color: #94a3b8; display: flex; justify-content: center; align-items: center; height: 100vh; font-family: sans-serif;'><h1>Game Quit. You can close this tab.</h1></body></html>"
 
 if __name__ == "__main__":
+    start_snapshots()
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
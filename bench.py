@@ -0,0 +1,250 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Keep the app's player history out of the working tree while benchmarking
+os.environ.setdefault("DARTS_HISTORY_DB", os.path.join(tempfile.gettempdir(), "darts_bench_history.db"))
+
+import MainGame as mg
+import scoring_logic
+from DartsGame import DartsGame
+from Practice20Game import Practice20Game
+from app import Match
+
+OUTPUT_FILE = "bench_output.txt"
+SEED = 26
+
+DART_INPUTS = ["T20", "20", "5", "1", "T19", "19", "D16", "D20", "25", "50", "MISS", "T5", "D1", "12"]
+
+
+def _inputs(n, seed=SEED):
+    rng = random.Random(seed)
+    return [rng.choice(DART_INPUTS) for _ in range(n)]
+
+
+def _leg_darts(seed=SEED):
+    """A fixed dart sequence that finishes a 501 leg following CHECKOUTS once it can."""
+    rng = random.Random(seed)
+    game = DartsGame(start_score=501)
+    darts = []
+    while game.score > 0 and len(darts) < 200:
+        route = game.checkout_suggestion()
+        target = route[0] if route else "T20"
+        if target == "D25":
+            target = "50"
+        dart = target if rng.random() < 0.4 else rng.choice(["20", "1", "5", "MISS"])
+        result, _ = game.throw(dart)
+        darts.append(dart)
+        if result in ("BUST", "NO_DOUBLE"):
+            game.end_turn()
+    return darts
+
+
+def bench_parse_score():
+    inputs = _inputs(1000)
+    def run():
+        for s in inputs:
+            mg.parse_score(s)
+    return run, len(inputs)
+
+
+def bench_throw():
+    darts = _leg_darts()
+    def run():
+        game = DartsGame()
+        for d in darts:
+            game.throw(d)
+    return run, len(darts)
+
+
+def bench_undo_last_dart():
+    darts = _leg_darts()
+    def run():
+        game = DartsGame()
+        for d in darts:
+            game.throw(d)
+        for _ in darts:
+            game.undo_last_dart()
+    return run, len(darts)
+
+
+def bench_average():
+    game = DartsGame()
+    for d in _leg_darts()[:-1]:
+        game.throw(d)
+    def run():
+        for _ in range(1000):
+            game.average()
+    return run, 1000
+
+
+def bench_practice_throw():
+    inputs = _inputs(99)
+    def run():
+        game = Practice20Game(max_darts=99)
+        for d in inputs:
+            game.throw(d)
+    return run, len(inputs)
+
+
+def bench_checkout_suggestion():
+    game = DartsGame()
+    scores = list(range(2, 502))
+    def run():
+        for s in scores:
+            game.score = s
+            game.checkout_suggestion()
+    return run, len(scores)
+
+
+def bench_get_score_from_coords():
+    rng = random.Random(SEED)
+    points = [(rng.uniform(0, 800), rng.uniform(0, 800)) for _ in range(1000)]
+    def run():
+        for x, y in points:
+            scoring_logic.get_score_from_coords(x, y, 400, 400, 350, vertical_scale=0.9, ellipse_angle=5.0)
+    return run, len(points)
+
+
+def bench_get_coords_from_score():
+    inputs = _inputs(1000)
+    def run():
+        random.seed(SEED)
+        for s in inputs:
+            scoring_logic.get_coords_from_score(s)
+    return run, len(inputs)
+
+
+def bench_export_session():
+    darts = _leg_darts()
+    players = [DartsGame("A"), DartsGame("B")]
+    for p in players:
+        for d in darts[:-1]:
+            p.throw(d)
+    match = Match(players, best_of=3)
+    def run():
+        for _ in range(100):
+            match.export_session()
+    return run, 100
+
+
+BENCHMARKS = {
+    "parse_score": bench_parse_score,
+    "DartsGame.throw": bench_throw,
+    "DartsGame.undo_last_dart": bench_undo_last_dart,
+    "DartsGame.average": bench_average,
+    "Practice20Game.throw": bench_practice_throw,
+    "DartsGame.checkout_suggestion": bench_checkout_suggestion,
+    "get_score_from_coords": bench_get_score_from_coords,
+    "get_coords_from_score": bench_get_coords_from_score,
+    "Match.export_session": bench_export_session,
+}
+
+
+def measure(setup, min_time=0.5, repeats=5):
+    """Returns ops/sec (best of repeats) and allocation stats for one benchmark."""
+    run, ops = setup()
+    run()  # warm up
+
+    # Calibrate how many runs fill min_time
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        loops *= 2
+
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        run()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        run()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": (ops * loops) / best,
+        "peak_bytes_per_op": max(0, peak - before) / ops,
+        "retained_bytes_per_op": max(0, after - before) / ops,
+    }
+
+
+def format_results(results, baseline=None, threshold=0.1):
+    lines = [f"{'benchmark':<32}{'ops/sec':>14}{'peak B/op':>12}{'kept B/op':>12}"
+             + (f"{'baseline':>14}{'change':>10}" if baseline else "")]
+    regressions = []
+    for name, r in results.items():
+        line = f"{name:<32}{r['ops_per_sec']:>14,.0f}{r['peak_bytes_per_op']:>12.1f}{r['retained_bytes_per_op']:>12.1f}"
+        base = (baseline or {}).get(name)
+        if base:
+            change = r["ops_per_sec"] / base["ops_per_sec"] - 1
+            line += f"{base['ops_per_sec']:>14,.0f}{change:>+10.1%}"
+            if change < -threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        lines.append(line)
+    return "\n".join(lines), regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the scoring and game engine hot paths")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against a JSON baseline and write " + OUTPUT_FILE)
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown that counts as a regression (default 0.1)")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    results = {name: measure(BENCHMARKS[name], args.min_time) for name in names}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    table, regressions = format_results(results, baseline, args.threshold)
+    print(table)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(OUTPUT_FILE, "w") as f:
+            f.write(table + "\n")
+            if regressions:
+                f.write(f"\n{len(regressions)} regression(s): {', '.join(regressions)}\n")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
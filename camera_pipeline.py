@@ -0,0 +1,339 @@
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import debug_camera
+from frame_context import BufferPool, FrameContext
+from scoring_logic import get_score_from_coords
+
+# Header slots in the shared int64 control block
+LATEST = 0      # slot holding the newest complete frame (-1 before the first)
+COUNT = 1       # frames written so far; the next frame number
+STOP = 2        # set to 1 to ask every process to exit
+CONSUMED = 3    # last frame number the detector finished with
+_FIXED = 4
+
+DETECTOR = 0
+DISPLAY = 1
+
+
+class FrameRing:
+    """
+    Fixed-size ring of BGR frames in shared memory with one writer (capture) and a
+    few pinned readers. Readers work on the frame in place; the writer never
+    overwrites a slot a reader has pinned, so there is no pickling and no copy
+    between processes. Frame numbers per slot are -1 while a slot is being written.
+    Claiming a slot and pinning one happen under lock (a multiprocessing lock shared
+    by every process on the ring), held only for those few index updates and never
+    while a frame is filled or read.
+    """
+
+    def __init__(self, shape, n_slots=4, n_readers=2, frames_name=None, control_name=None, lock=None):
+        self.shape = tuple(shape)
+        self.lock = lock if lock is not None else mp.Lock()
+        self.n_slots = n_slots
+        self.n_readers = n_readers
+        frame_bytes = int(np.prod(self.shape))
+        control_len = _FIXED + n_slots + n_readers
+        self.owner = frames_name is None
+
+        if self.owner:
+            self._frames_shm = shared_memory.SharedMemory(create=True, size=frame_bytes * n_slots)
+            self._control_shm = shared_memory.SharedMemory(create=True, size=control_len * 8)
+        else:
+            self._frames_shm = shared_memory.SharedMemory(name=frames_name)
+            self._control_shm = shared_memory.SharedMemory(name=control_name)
+
+        self.frames = np.ndarray((n_slots,) + self.shape, dtype=np.uint8, buffer=self._frames_shm.buf)
+        self.control = np.ndarray((control_len,), dtype=np.int64, buffer=self._control_shm.buf)
+        self.frame_no = self.control[_FIXED:_FIXED + n_slots]
+        self.pins = self.control[_FIXED + n_slots:]
+
+        if self.owner:
+            self.control[:] = 0
+            self.control[LATEST] = -1
+            self.control[CONSUMED] = -1
+            self.frame_no[:] = -1
+            self.pins[:] = -1
+
+    def spec(self):
+        """Small picklable description other processes use to attach."""
+        return {
+            "shape": self.shape,
+            "n_slots": self.n_slots,
+            "n_readers": self.n_readers,
+            "frames_name": self._frames_shm.name,
+            "control_name": self._control_shm.name,
+        }
+
+    @classmethod
+    def attach(cls, spec, lock):
+        return cls(**spec, lock=lock)
+
+    @property
+    def stopped(self):
+        return bool(self.control[STOP])
+
+    def stop(self):
+        self.control[STOP] = 1
+
+    def pending(self):
+        """Frames written that the detector hasn't consumed yet."""
+        return self.control[COUNT] - 1 - self.control[CONSUMED]
+
+    def write(self, fill):
+        """Calls fill(slot_array) on a free slot and publishes it. Returns fill's result."""
+        with self.lock:
+            start = (self.control[LATEST] + 1) % self.n_slots
+            for i in range(self.n_slots):
+                slot = (start + i) % self.n_slots
+                if slot not in self.pins:
+                    break
+            else:
+                raise RuntimeError("No free slot in frame ring; use more slots than readers")
+            # Marked as being written, so no reader pins it until it is published
+            self.frame_no[slot] = -1
+        ok = fill(self.frames[slot])
+        if not ok:
+            return ok
+        with self.lock:
+            self.frame_no[slot] = self.control[COUNT]
+            self.control[LATEST] = slot
+            self.control[COUNT] += 1
+        return ok
+
+    def acquire(self, reader, after=-1, sequential=False):
+        """
+        Pins and returns (frame_no, frame_view) for the newest frame after `after`, or
+        for frame after + 1 when sequential and it is still in the ring. Returns
+        (None, None) when there is nothing new. Call release() when done.
+        """
+        with self.lock:
+            slot = -1
+            if sequential:
+                matches = np.flatnonzero(self.frame_no == after + 1)
+                if matches.size:
+                    slot = int(matches[0])
+            if slot < 0:
+                slot = int(self.control[LATEST])
+            if slot < 0:
+                return None, None
+            frame_no = int(self.frame_no[slot])
+            if frame_no <= after:
+                return None, None
+            self.pins[reader] = slot
+        return frame_no, self.frames[slot]
+
+    def release(self, reader):
+        with self.lock:
+            self.pins[reader] = -1
+
+    def close(self):
+        del self.frames, self.control, self.frame_no, self.pins
+        self._frames_shm.close()
+        self._control_shm.close()
+        if self.owner:
+            self._frames_shm.unlink()
+            self._control_shm.unlink()
+
+
+def capture_process(source, width, height, n_slots, policy, spec_queue, lock):
+    """Owns the camera and the ring. With the 'block' policy it waits for the detector."""
+    cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    ret, first = cap.read()
+    if not ret:
+        spec_queue.put(None)
+        return
+
+    ring = FrameRing(first.shape, n_slots=n_slots, lock=lock)
+    spec_queue.put(ring.spec())
+
+    def fill(buf):
+        ok, image = cap.read(image=buf)
+        if ok and image is not buf:
+            # The driver handed back a different buffer (size change); copy it in
+            np.copyto(buf, image)
+        return ok
+
+    max_pending = ring.n_slots - ring.n_readers - 1
+    try:
+        while not ring.stopped:
+            if policy == "block":
+                while ring.pending() >= max_pending and not ring.stopped:
+                    time.sleep(0.001)
+            if not ring.write(fill):
+                break
+    finally:
+        ring.stop()
+        cap.release()
+        # Give readers a moment to let go of their views before unlinking
+        time.sleep(0.2)
+        ring.close()
+
+
+def detect_process(spec, lock, policy, commands, results):
+    """Runs background subtraction on ring frames in place and publishes small result tuples."""
+    ring = FrameRing.attach(spec, lock)
+    pool = BufferPool()
+    background = None
+    calibration = None
+    last = -1
+    try:
+        while not ring.stopped:
+            try:
+                while True:
+                    command, arg = commands.get_nowait()
+                    if command == "background":
+                        frame_no, frame = ring.acquire(DETECTOR, -1)
+                        if frame is not None:
+                            background = FrameContext.from_gray(FrameContext(frame).gray.copy())
+                            ring.release(DETECTOR)
+                    elif command == "clear":
+                        background = None
+                    elif command == "calibration":
+                        calibration = arg
+            except queue.Empty:
+                pass
+
+            frame_no, frame = ring.acquire(DETECTOR, last, sequential=(policy == "block"))
+            if frame is None:
+                time.sleep(0.001)
+                continue
+
+            darts = []
+            if background is not None:
+                for cnt, (x, y) in debug_camera.detect_darts(FrameContext(frame, pool), background):
+                    score = None
+                    if calibration and calibration["center"] and calibration["board_radius"]:
+                        params = dict(calibration)
+                        cx, cy = params.pop("center")
+                        radius = params.pop("board_radius")
+                        score = get_score_from_coords(x, y, cx, cy, radius, **params)
+                    darts.append((cnt, (x, y), score))
+            ring.release(DETECTOR)
+            ring.control[CONSUMED] = frame_no
+            last = frame_no
+
+            try:
+                results.put_nowait((frame_no, darts))
+            except queue.Full:
+                pass  # Display is behind; it only ever wants the newest result
+    finally:
+        frame = None  # drop the view so the mapping can be closed
+        ring.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Debug camera with capture, detection and display in separate processes")
+    parser.add_argument("--source", default="0", help="Camera index or video file")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--slots", type=int, default=4, help="Frames in the shared ring (at least 4)")
+    parser.add_argument("--policy", choices=["drop", "block"], default="drop",
+                        help="drop: detector skips to the newest frame; block: capture waits for the detector")
+    args = parser.parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+
+    ctx = mp.get_context("spawn")
+    spec_queue = ctx.Queue()
+    # Shared by every process on the ring; it can only be handed over at process start
+    ring_lock = ctx.Lock()
+    commands = ctx.Queue()
+    results = ctx.Queue(maxsize=2)
+
+    capture = ctx.Process(target=capture_process,
+                          args=(source, args.width, args.height, max(4, args.slots), args.policy, spec_queue, ring_lock),
+                          daemon=True)
+    capture.start()
+    spec = spec_queue.get()
+    if spec is None:
+        print("Error: Could not open video source.")
+        return
+
+    detector = ctx.Process(target=detect_process, args=(spec, ring_lock, args.policy, commands, results), daemon=True)
+    detector.start()
+    ring = FrameRing.attach(spec, ring_lock)
+
+    cv2.namedWindow("Debug Camera")
+    cv2.setMouseCallback("Debug Camera", debug_camera.mouse_callback)
+    debug_camera.print_instructions()
+
+    # The frame as captured, for key handlers (auto-detect, background), and the copy annotated for display
+    clean_frame = np.empty(ring.shape, dtype=np.uint8)
+    display_frame = np.empty(ring.shape, dtype=np.uint8)
+    detections = []
+    detected_frame = -1
+    last = -1
+    sent_calibration = None
+    shown = 0
+    fps_start = time.perf_counter()
+    fps = 0.0
+
+    try:
+        while not ring.stopped:
+            frame_no, frame = ring.acquire(DISPLAY, last)
+            if frame is None:
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+            np.copyto(clean_frame, frame)
+            ring.release(DISPLAY)
+            np.copyto(display_frame, clean_frame)
+            dropped = frame_no - last - 1 if last >= 0 else 0
+            last = frame_no
+
+            try:
+                while True:
+                    detected_frame, detections = results.get_nowait()
+            except queue.Empty:
+                pass
+
+            for cnt, (x, y), score in detections:
+                cv2.drawContours(display_frame, [cnt], -1, (0, 255, 0), 2)
+                if score is not None:
+                    cv2.circle(display_frame, (x, y), 4, (0, 0, 255), -1)
+                    cv2.putText(display_frame, str(score), (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+
+            debug_camera.composite_overlay(display_frame)
+
+            shown += 1
+            now = time.perf_counter()
+            if now - fps_start >= 1.0:
+                fps = shown / (now - fps_start)
+                shown = 0
+                fps_start = now
+            lag = frame_no - detected_frame if detected_frame >= 0 else 0
+            cv2.putText(display_frame, f"{fps:.0f} fps | detect lag {lag} | dropped {dropped}",
+                        (20, display_frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+            cv2.imshow("Debug Camera", display_frame)
+
+            key = cv2.waitKey(1) & 0xFF
+            if not debug_camera.handle_key(key, clean_frame):
+                break
+            if key == ord('b'):
+                commands.put(("background", None))
+            elif key == ord('c'):
+                commands.put(("clear", None))
+
+            calibration = debug_camera.calibration_params()
+            if calibration != sent_calibration:
+                commands.put(("calibration", calibration))
+                sent_calibration = calibration
+    finally:
+        frame = None  # drop the view so the mapping can be closed
+        ring.stop()
+        ring.close()
+        detector.join(timeout=2)
+        capture.join(timeout=2)
+        cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
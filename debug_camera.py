@@ -1,7 +1,11 @@
 import cv2
 import math
+import time
 import numpy as np
-from scoring_logic import get_score_from_coords
+from adaptive_quality import QualityController
+from frame_context import AllocationMeter, BufferPool, FrameContext, MotionGate
+from rectify import CALIBRATION_POINTS, DART_MIN_AREA, Rectifier
+from scoring_logic import CODE_MISS, get_score_from_coords, get_scores_from_coords
 
 # Global variables
 center_point = None
@@ -19,22 +23,29 @@ calibration_angle = 0.0
 ellipse_angle = 0.0
 dragging = None  # 'CENTER' or 'RADIUS'
 show_threshold = False # Debug view
+show_segments = False # Segment boundary overlay
+show_allocations = False # Per-frame allocation counter
+homography_points = [] # Clicked calibration points for the homography
+collecting_homography = False
+rectifier = None # Perspective calibration, replaces the ellipse model when set
+
+# Static overlay, re-rendered only when the calibration (or anything else drawn) changes
+_overlay_key = None
+_overlay_layer = None
+_overlay_mask = None
+_overlay_fringe = None
 
 def auto_detect_board(frame):
     """
     Automatically detects the dartboard using edge detection and ellipse fitting.
     Returns (center_point, radius, vertical_scale, angle) or (None, None, None, None).
     """
-    # Convert to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Blur to reduce noise (heavier blur helps ignore internal wire details)
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-    
-    # Adaptive Thresholding - robust against lighting
-    # Block size 11, C=2 are standard starting points
-    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                   cv2.THRESH_BINARY_INV, 11, 2)
+    ctx = FrameContext.of(frame)
+
+    # Adaptive threshold of the blurred gray frame - robust against lighting.
+    # Heavier blur helps ignore internal wire details; block size 11, C=2 are
+    # standard starting points. Shared with the threshold debug view.
+    thresh = ctx.adaptive_threshold(block_size=11, c=2, ksize=7)
     
     # Morphological operations to clean up noise and close gaps
     kernel = np.ones((3,3), np.uint8)
@@ -46,7 +57,7 @@ def auto_detect_board(frame):
     best_ellipse = None
     max_score = 0
     
-    height, width = frame.shape[:2]
+    height, width = ctx.shape[:2]
     center_frame_x, center_frame_y = width // 2, height // 2
     
     for cnt in contours:
@@ -109,8 +120,57 @@ def auto_detect_board(frame):
         
     return None, None, None, None
 
+def detect_darts(frame, background_frame, min_area=50):
+    """
+    Finds objects that differ from the captured background (potential darts).
+    frame and background_frame may be images or FrameContexts.
+    Returns a list of (contour, (x, y)) where (x, y) is the contour centroid.
+    """
+    # Gray conversion, diff and threshold are cached on the contexts, so keep the
+    # background as a FrameContext to convert it only once
+    ctx = FrameContext.of(frame)
+    thresh = ctx.changed(FrameContext.of(background_frame), threshold=30)
+
+    # Find contours (potential darts)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    darts = []
+    for cnt in contours:
+        if cv2.contourArea(cnt) > min_area: # Filter small noise
+            # Use Centroid (Center of Mass) instead of Bounding Box center
+            M = cv2.moments(cnt)
+            if M["m00"] != 0:
+                dart_x = int(M["m10"] / M["m00"])
+                dart_y = int(M["m01"] / M["m00"])
+            else:
+                x, y, w, h = cv2.boundingRect(cnt)
+                dart_x = x + w // 2
+                dart_y = y + h // 2
+            darts.append((cnt, (dart_x, dart_y)))
+    return darts
+
 def mouse_callback(event, x, y, flags, param):
-    global center_point, board_radius, last_score, last_click, vertical_scale, dragging, treble_scale, double_scale, outer_double_scale, inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, show_threshold
+    global center_point, board_radius, last_score, last_click, vertical_scale, dragging, treble_scale, double_scale, outer_double_scale, inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, show_threshold, homography_points, collecting_homography, rectifier
+
+    if event == cv2.EVENT_LBUTTONDOWN and collecting_homography:
+        homography_points.append((x, y))
+        if len(homography_points) >= 4:
+            try:
+                rectifier = Rectifier(homography_points)
+                print(f"Homography fitted to {len(homography_points)} points, error {rectifier.error_mm:.1f} mm")
+            except ValueError as e:
+                print(f"Homography failed: {e}")
+                homography_points.pop()
+        if len(homography_points) == len(CALIBRATION_POINTS):
+            collecting_homography = False
+        return
+
+    if event == cv2.EVENT_LBUTTONDOWN and rectifier is not None:
+        # Testing mode with the perspective calibration
+        last_score = rectifier.score_image_point(x, y, **ring_scales())
+        last_click = (x, y)
+        print(f"Clicked at ({x}, {y}) -> Score: {last_score}")
+        return
 
     if event == cv2.EVENT_LBUTTONDOWN:
         # Check for drag start if calibration is active
@@ -172,24 +232,324 @@ def mouse_callback(event, x, y, flags, param):
     elif event == cv2.EVENT_LBUTTONUP:
         dragging = None
 
-def main():
-    global center_point, board_radius, background_frame, vertical_scale, dragging, treble_scale, double_scale, outer_double_scale, inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, show_threshold
+def draw_calibration(display_frame):
+    """Draws the calibration rings, markers, instructions and last test click onto display_frame."""
+    # 2. On-Screen Instructions
+    if collecting_homography:
+        left, right = CALIBRATION_POINTS[len(homography_points)]
+        cv2.putText(display_frame, f"HOMOGRAPHY {len(homography_points) + 1}/{len(CALIBRATION_POINTS)}: "
+                    f"Click outer double edge on the {left}|{right} wire", (20, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+        if len(homography_points) >= 4:
+            cv2.putText(display_frame, "Press 'h' to finish with these points", (20, 80),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+    elif rectifier is not None:
+        cv2.putText(display_frame, "Test Mode (homography): Click to check score", (20, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        cv2.putText(display_frame, "'h': Recalibrate | 'b': BG | 'c': Clear", (20, 80),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+    elif center_point is None:
+        cv2.putText(display_frame, "STEP 1: Click CENTER of Bullseye", (20, 50), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
+    elif board_radius is None:
+        cv2.putText(display_frame, "STEP 2: Click Double Ring (Right Side)", (20, 50), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
+    else:
+        cv2.putText(display_frame, "Test Mode: Click to check score", (20, 50), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        cv2.putText(display_frame, "Drag lines | 'b': BG | 'a': Auto-detect", (20, 80), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+        cv2.putText(display_frame, "Press 'c' to clear calibration", (20, 105), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
 
-    # Initialize Camera (0 is usually default, 1 might be DroidCam if 0 is integrated)
-    # If DroidCam is running, it usually appears as a webcam device.
-    cap = cv2.VideoCapture(0)
-    
-    # Request 720p
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    # 3. Draw Calibration Markers
+    for px, py in homography_points:
+        cv2.drawMarker(display_frame, (px, py), (255, 0, 255), cv2.MARKER_TILTED_CROSS, 14, 2)
 
-    if not cap.isOpened():
-        print("Error: Could not open video source. Try changing the index in cv2.VideoCapture(0).")
-        return
+    if rectifier is not None:
+        draw_homography(display_frame)
+    elif center_point:
+        color = (0, 0, 255) if dragging == 'CENTER' else (0, 255, 0)
+        cv2.drawMarker(display_frame, center_point, color, cv2.MARKER_CROSS, 20, 2)
 
-    cv2.namedWindow("Debug Camera")
-    cv2.setMouseCallback("Debug Camera", mouse_callback)
+    if center_point and board_radius and rectifier is None:
+        color = (0, 0, 255) if dragging == 'RADIUS' else (0, 255, 0)
+        # Draw Ellipse for outer double
+        axes = (int(board_radius), int(board_radius * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes, ellipse_angle, 0, 360, color, 2)
+
+        # Draw Ellipse for treble
+        axes_treble = (int(board_radius * treble_scale), int(board_radius * treble_scale * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes_treble, ellipse_angle, 0, 360, (255, 255, 0), 1)
+
+        # Draw Ellipse for Outer Double
+        axes_od = (int(board_radius * outer_double_scale), int(board_radius * outer_double_scale * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes_od, ellipse_angle, 0, 360, (0, 255, 0), 1)
+
+        # Draw Ellipse for Inner Double
+        axes_id = (int(board_radius * double_scale), int(board_radius * double_scale * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes_id, ellipse_angle, 0, 360, (0, 255, 0), 1)
+
+        # Draw Ellipse for Outer Bull (25)
+        axes_bull = (int(board_radius * bull_scale), int(board_radius * bull_scale * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes_bull, ellipse_angle, 0, 360, (0, 0, 255), 1)
+
+        # Draw Ellipse for Inner Bull (50)
+        axes_ibull = (int(board_radius * inner_bull_scale), int(board_radius * inner_bull_scale * vertical_scale))
+        cv2.ellipse(display_frame, center_point, axes_ibull, ellipse_angle, 0, 360, (0, 0, 255), 1)
+
+        # Draw 20 Segment Direction
+        # Angle 0 (Up) + calibration_angle. 
+        # Note: In image coords, Up is -90 deg. So we draw at -90 + calibration_angle.
+        rad = math.radians(-90 + calibration_angle)
+        # We must apply the ellipse rotation to this point as well
+        # Point on un-rotated ellipse
+        px = board_radius * math.cos(rad)
+        py = board_radius * math.sin(rad) * vertical_scale
+        # Rotate by ellipse_angle
+        rad_e = math.radians(ellipse_angle)
+        end_x = int(center_point[0] + px * math.cos(rad_e) - py * math.sin(rad_e))
+        end_y = int(center_point[1] + px * math.sin(rad_e) + py * math.cos(rad_e))
+
+        cv2.line(display_frame, center_point, (end_x, end_y), (0, 255, 255), 2)
+        cv2.putText(display_frame, "20", (end_x, end_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+        # Stats
+        stats = f"Scale:{vertical_scale:.2f} | Trb:{treble_scale:.2f} | Dbl:{double_scale:.2f}-{outer_double_scale:.2f} | Bull:{inner_bull_scale:.3f}-{bull_scale:.3f}"
+        cv2.putText(display_frame, stats, (20, 170), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    # 4. Draw Last Test Click
+    if last_click:
+        cv2.circle(display_frame, last_click, 5, (255, 0, 255), -1)
+        cv2.putText(display_frame, f"Score: {last_score}", (last_click[0]+10, last_click[1]), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
+
+def draw_homography(display_frame):
+    """Draws the rings and the 20 direction of the perspective calibration, projected into the camera frame."""
+    rings = [(outer_double_scale, (0, 255, 0), 2), (double_scale, (0, 255, 0), 1),
+             (treble_scale + 0.03, (255, 255, 0), 1), (treble_scale - 0.03, (255, 255, 0), 1),
+             (bull_scale, (0, 0, 255), 1), (inner_bull_scale, (0, 0, 255), 1)]
+    for scale, color, thickness in rings:
+        cv2.polylines(display_frame, [rectifier.ring_polyline(scale)], True, color, thickness)
+
+    c = rectifier.center
+    (cx, cy), (end_x, end_y) = np.round(rectifier.to_image([(c, c), (c, c - rectifier.radius)])).astype(int)
+    cv2.drawMarker(display_frame, (int(cx), int(cy)), (0, 255, 0), cv2.MARKER_CROSS, 20, 2)
+    cv2.line(display_frame, (int(cx), int(cy)), (int(end_x), int(end_y)), (0, 255, 255), 2)
+    cv2.putText(display_frame, "20", (int(end_x), int(end_y)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    stats = f"Homography: {len(homography_points)} points | Fit error: {rectifier.error_mm:.1f} mm"
+    cv2.putText(display_frame, stats, (20, 170), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+def ring_scales():
+    """The ring sizes, which apply with either calibration model."""
+    return {
+        "treble_scale": treble_scale,
+        "double_scale": double_scale,
+        "outer_double_scale": outer_double_scale,
+        "inner_bull_scale": inner_bull_scale,
+        "bull_scale": bull_scale,
+    }
+
+def draw_segment_boundaries(layer):
+    """
+    Marks every pixel where the score returned by the scoring model changes, so the
+    overlay shows exactly the boundaries get_score_from_coords uses (ellipse, rotation
+    and all ring scales included). Costs a full-frame scoring pass, so it is only
+    done when the cached overlay is rebuilt.
+    """
+    height, width = layer.shape[:2]
+    if rectifier is not None:
+        codes = rectifier.score_image_grid(height, width, **ring_scales())
+    else:
+        ys, xs = np.mgrid[0:height, 0:width]
+        codes = get_scores_from_coords(
+            (xs - center_point[0]) / board_radius, (ys - center_point[1]) / board_radius,
+            vertical_scale=vertical_scale, calibration_angle=calibration_angle, ellipse_angle=ellipse_angle,
+            **ring_scales()
+        )
+    edges = np.zeros((height, width), dtype=bool)
+    edges[:, 1:] |= codes[:, 1:] != codes[:, :-1]
+    edges[1:, :] |= codes[1:, :] != codes[:-1, :]
+    # Nothing to draw outside the board
+    edges &= codes != CODE_MISS
+    layer[edges] = (255, 128, 0)
+
+def _current_overlay_key(shape):
+    return (shape, center_point, board_radius, vertical_scale, treble_scale, double_scale, outer_double_scale,
+            inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, dragging, last_click, last_score,
+            show_segments, tuple(homography_points), collecting_homography)
+
+def composite_overlay(display_frame):
+    """
+    Draws the calibration overlay onto display_frame. The overlay is rendered once
+    whenever its inputs change, then composited onto each frame: opaque pixels in
+    one masked copy, and OpenCV's anti-aliased text edges blended from precomputed
+    per-pixel weights.
+    """
+    global _overlay_key, _overlay_layer, _overlay_mask, _overlay_fringe
+
+    key = _current_overlay_key(display_frame.shape)
+    if key != _overlay_key:
+        # Render on black and on white: pixels that match are opaque, pixels that
+        # differ (other than untouched ones) were blended with the background
+        on_black = np.zeros(display_frame.shape, dtype=np.uint8)
+        on_white = np.full(display_frame.shape, 255, dtype=np.uint8)
+        for layer in (on_black, on_white):
+            if show_segments and (rectifier is not None or (center_point and board_radius)):
+                draw_segment_boundaries(layer)
+            draw_calibration(layer)
+        opaque = np.all(on_black == on_white, axis=2)
+        untouched = np.all(on_black == 0, axis=2) & np.all(on_white == 255, axis=2)
+        fy, fx = np.nonzero(~opaque & ~untouched)
+        _overlay_layer = on_black
+        _overlay_mask = opaque.astype(np.uint8)
+        # Flat indices into the frame buffer so blending is one gather and one scatter:
+        # out = drawn_on_black + weight * frame / 255
+        width = display_frame.shape[1]
+        idx = ((fy * width + fx)[:, None] * 3 + np.arange(3)).ravel()
+        base = on_black[fy, fx].astype(np.uint16).ravel()
+        weight = (on_white[fy, fx].astype(np.uint16) - on_black[fy, fx]).ravel()
+        # Scratch arrays so blending doesn't allocate per frame
+        _overlay_fringe = (idx, base, weight, np.empty(idx.size, np.uint8), np.empty(idx.size, np.uint16))
+        _overlay_key = key
+
+    cv2.copyTo(_overlay_layer, _overlay_mask, display_frame)
+    idx, base, weight, pixels, blended = _overlay_fringe
+    if idx.size:
+        flat = display_frame.reshape(-1)
+        # mode="clip" avoids the bounds-check copy; the indices are always valid
+        np.take(flat, idx, out=pixels, mode="clip")
+        np.copyto(blended, pixels)
+        blended *= weight
+        blended += 127
+        blended //= 255
+        blended += base
+        np.copyto(pixels, blended, casting="unsafe")
+        np.put(flat, idx, pixels, mode="clip")
+
+def rescale_calibration(factor, shape):
+    """Rescales every pixel-based part of the calibration after the capture size changed."""
+    global center_point, board_radius, last_click, homography_points, rectifier, background_frame
+
+    if center_point is not None:
+        center_point = (int(round(center_point[0] * factor)), int(round(center_point[1] * factor)))
+    if board_radius is not None:
+        board_radius *= factor
+    if last_click is not None:
+        last_click = (int(round(last_click[0] * factor)), int(round(last_click[1] * factor)))
+    homography_points = [(int(round(x * factor)), int(round(y * factor))) for x, y in homography_points]
+    if rectifier is not None:
+        rectifier = Rectifier(homography_points)
+    if background_frame is not None:
+        size = (shape[1], shape[0])
+        background_frame = FrameContext.from_gray(cv2.resize(background_frame.gray, size, interpolation=cv2.INTER_AREA))
+
+def calibration_params():
+    """Current calibration as keyword arguments for get_score_from_coords (plus the centre and radius)."""
+    return {
+        "center": center_point,
+        "board_radius": board_radius,
+        "vertical_scale": vertical_scale,
+        "treble_scale": treble_scale,
+        "double_scale": double_scale,
+        "outer_double_scale": outer_double_scale,
+        "inner_bull_scale": inner_bull_scale,
+        "bull_scale": bull_scale,
+        "calibration_angle": calibration_angle,
+        "ellipse_angle": ellipse_angle,
+    }
+
+def handle_key(key, frame):
+    """Applies a keyboard command to the calibration state. Returns False when the user quits."""
+    global center_point, board_radius, background_frame, vertical_scale, treble_scale, double_scale, outer_double_scale, inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, show_threshold, show_segments, show_allocations, homography_points, collecting_homography, rectifier
 
+    if key == ord('q'):
+        return False
+    elif key == ord('c'):
+        center_point = None
+        board_radius = None
+        background_frame = None
+        homography_points = []
+        collecting_homography = False
+        rectifier = None
+        print("Calibration cleared.")
+    elif key == ord('b'):
+        # Diffing only needs the background's gray image, not a BGR copy
+        background_frame = FrameContext.from_gray(FrameContext.of(frame).gray.copy())
+        print("Background captured.")
+    elif key == ord(']'):
+        vertical_scale += 0.01
+    elif key == ord('['):
+        vertical_scale = max(0.1, vertical_scale - 0.01)
+    elif key == ord('='):
+        treble_scale += 0.01
+    elif key == ord('-'):
+        treble_scale -= 0.01
+    elif key == ord('1'):
+        inner_bull_scale = max(0.005, inner_bull_scale - 0.002)
+    elif key == ord('2'):
+        inner_bull_scale += 0.002
+    elif key == ord('3'):
+        bull_scale = max(inner_bull_scale, bull_scale - 0.002)
+    elif key == ord('4'):
+        bull_scale += 0.002
+    elif key == ord('5'):
+        double_scale = max(0.01, double_scale - 0.005)
+    elif key == ord('6'):
+        double_scale = min(outer_double_scale, double_scale + 0.005)
+    elif key == ord('7'):
+        outer_double_scale = max(double_scale, outer_double_scale - 0.005)
+    elif key == ord('8'):
+        outer_double_scale += 0.005
+    elif key == ord('.'):
+        calibration_angle += 1.0
+    elif key == ord(','):
+        calibration_angle -= 1.0
+    elif key == ord('t'):
+        show_threshold = not show_threshold
+    elif key == ord('s'):
+        show_segments = not show_segments
+    elif key == ord('m'):
+        show_allocations = not show_allocations
+    elif key == ord('h'):
+        if collecting_homography and rectifier is not None:
+            collecting_homography = False
+            print(f"Homography calibration finished with {len(homography_points)} points.")
+        else:
+            homography_points = []
+            collecting_homography = True
+            rectifier = None
+            print("Homography calibration: click the outer edge of the double ring where these wires meet it:")
+            print("  " + ", ".join(f"{left}|{right}" for left, right in CALIBRATION_POINTS))
+            print("  (at least the first four; press 'h' to finish early)")
+    elif key == ord('0'):
+        ellipse_angle += 1.0
+    elif key == ord('9'):
+        ellipse_angle -= 1.0
+    elif key == ord('a'):
+        c, r, v, a = auto_detect_board(frame)
+        if c is not None:
+            center_point = c
+            board_radius = r
+            vertical_scale = v
+            ellipse_angle = a
+
+            # Reset ring scales to standard dartboard ratios
+            treble_scale = 0.606      # 103/170 (Center of treble)
+            double_scale = 0.953      # 162/170 (Inner double)
+            outer_double_scale = 1.0  # 170/170 (Outer double)
+            inner_bull_scale = 0.0374 # 6.35/170
+            bull_scale = 0.0935       # 15.9/170
+
+            print(f"Auto-detected: Center={c}, Radius={r:.1f}, Scale={v:.2f}, Angle={a:.1f}")
+            print("Ring areas reset to standard dartboard dimensions.")
+        else:
+            print("Auto-detection failed. Try adjusting lighting or camera angle.")
+    return True
+
+def print_instructions():
     print("--- Darts Debug Camera ---")
     print("Step 1: Click the exact CENTER of the Bullseye.")
     print("Step 2: Click the OUTER EDGE of the Double Ring (at the 3 o'clock position / Right side).")
@@ -207,208 +567,155 @@ def main():
     print("  '9' / '0': Rotate Ellipse")
     print("  ',' / '.': Rotate Board")
     print("  't': Toggle Threshold View (Debug)")
+    print("  's': Toggle Segment Boundaries")
+    print("  'm': Toggle Allocation Counter")
+    print("  'h': Homography Calibration (perspective, 4-8 clicked points)")
     print("  'c': Clear Calibration")
     print("  'q': Quit")
 
+def main():
+    global center_point, board_radius, background_frame, vertical_scale, dragging, treble_scale, double_scale, outer_double_scale, inner_bull_scale, bull_scale, calibration_angle, ellipse_angle, show_threshold
+
+    # Initialize Camera (0 is usually default, 1 might be DroidCam if 0 is integrated)
+    # If DroidCam is running, it usually appears as a webcam device.
+    cap = cv2.VideoCapture(0)
+    
+    # Start at 720p; the quality controller moves up or down from there
+    quality = QualityController()
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, quality.capture_size[0])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, quality.capture_size[1])
+
+    if not cap.isOpened():
+        print("Error: Could not open video source. Try changing the index in cv2.VideoCapture(0).")
+        return
+
+    cv2.namedWindow("Debug Camera")
+    cv2.setMouseCallback("Debug Camera", mouse_callback)
+
+    print_instructions()
+
+    # Skips detection while the scene is static and polls slowly until something moves
+    gate = MotionGate()
+    detections = []
+    overlay_state = None
+
+    # Frame, display and preprocessing buffers are allocated once per resolution
+    pool = BufferPool()
+    meter = AllocationMeter()
+    frame = None
+    frame_no = 0
+    frame_width = None
+
     while True:
-        ret, frame = cap.read()
+        if show_allocations:
+            meter.start()
+
+        ret, frame = cap.read(frame)
         if not ret:
             break
+        started = time.perf_counter()
+        frame_no += 1
+
+        # Pixel calibrations follow the capture size when the controller changes it
+        if frame_width is not None and frame.shape[1] != frame_width:
+            rescale_calibration(frame.shape[1] / frame_width, frame.shape)
+        frame_width = frame.shape[1]
+
+        # Every view and detector below shares this frame's preprocessing
+        ctx = FrameContext(frame, pool)
+        display_frame = pool.get("display", frame.shape)
+        np.copyto(display_frame, frame)
 
-        display_frame = frame.copy()
+        # Clicks and drags count as activity so calibrating stays responsive
+        state = _current_overlay_key(frame.shape)
+        if state != overlay_state or dragging:
+            gate.wake()
+            overlay_state = state
+        active = gate.update(ctx)
 
         if show_threshold:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-            thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                           cv2.THRESH_BINARY_INV, 11, 2)
-            cv2.imshow("Debug Camera", thresh)
+            cv2.imshow("Debug Camera", ctx.adaptive_threshold())
         else:
 
             # 1. Background Subtraction Visualization
-            if background_frame is not None:
-                # Convert to gray for diffing
-                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                gray_bg = cv2.cvtColor(background_frame, cv2.COLOR_BGR2GRAY)
-                
-                # Calculate absolute difference
-                diff = cv2.absdiff(gray_bg, gray_frame)
-                
-                # Threshold to remove noise (adjust 30 if needed)
-                _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
-                
-                # Find contours (potential darts)
-                contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                for cnt in contours:
-                    if cv2.contourArea(cnt) > 50: # Filter small noise
-                        # Draw the actual shape of the detected object
-                        cv2.drawContours(display_frame, [cnt], -1, (0, 255, 0), 2)
-                        
+            if background_frame is None:
+                detections = []
+            else:
+                detect = active and quality.should_detect(frame_no)
+                if detect and rectifier is not None:
+                    # Detect and score on the small face-on image, then map back for drawing
+                    detections = []
+                    rectified = ctx.rectified(rectifier)
+                    for cnt, (u, v) in detect_darts(rectified, background_frame.rectified(rectifier), DART_MIN_AREA):
+                        score = rectifier.score(u, v, **ring_scales())
+                        cnt = np.round(rectifier.to_image(cnt.reshape(-1, 2))).astype(np.int32)
+                        (dart_x, dart_y), = np.round(rectifier.to_image([(u, v)])).astype(int)
+                        detections.append((cnt, (int(dart_x), int(dart_y)), score))
+                elif detect:
+                    # Detect on a downscaled copy when the controller asks for one
+                    detections = []
+                    scale = quality.scale
+                    for cnt, (x, y) in detect_darts(ctx.scaled(scale), background_frame.scaled(scale), 50 * scale * scale):
+                        dart_x, dart_y = int(x / scale), int(y / scale)
+                        if scale != 1:
+                            cnt = np.round(cnt / scale).astype(np.int32)
+                        score = None
                         # Calculate score if calibrated
                         if center_point and board_radius:
-                            # Use Centroid (Center of Mass) instead of Bounding Box center
-                            M = cv2.moments(cnt)
-                            if M["m00"] != 0:
-                                dart_x = int(M["m10"] / M["m00"])
-                                dart_y = int(M["m01"] / M["m00"])
-                            else:
-                                x, y, w, h = cv2.boundingRect(cnt)
-                                dart_x = x + w // 2
-                                dart_y = y + h // 2
-
-                            # Draw the detection point
-                            cv2.circle(display_frame, (dart_x, dart_y), 4, (0, 0, 255), -1)
-
                             score = get_score_from_coords(dart_x, dart_y, center_point[0], center_point[1], board_radius, 
                                                         vertical_scale=vertical_scale, treble_scale=treble_scale, 
                                                         double_scale=double_scale, outer_double_scale=outer_double_scale,
                                                         inner_bull_scale=inner_bull_scale, bull_scale=bull_scale,
                                                         calibration_angle=calibration_angle, ellipse_angle=ellipse_angle)
-                            cv2.putText(display_frame, str(score), (dart_x, dart_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+                        detections.append((cnt, (dart_x, dart_y), score))
+
+                # While idle (or between detections) the last detections are still shown
+                for cnt, (dart_x, dart_y), score in detections:
+                    # Draw the actual shape of the detected object
+                    cv2.drawContours(display_frame, [cnt], -1, (0, 255, 0), 2)
+
+                    if score is not None:
+                        # Draw the detection point
+                        cv2.circle(display_frame, (dart_x, dart_y), 4, (0, 0, 255), -1)
+                        cv2.putText(display_frame, str(score), (dart_x, dart_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
 
                 cv2.putText(display_frame, "BG Subtraction Active - Throw Dart to Test", (20, 140), 
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
-            # 2. On-Screen Instructions
-            if center_point is None:
-                cv2.putText(display_frame, "STEP 1: Click CENTER of Bullseye", (20, 50), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-            elif board_radius is None:
-                cv2.putText(display_frame, "STEP 2: Click Double Ring (Right Side)", (20, 50), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-            else:
-                cv2.putText(display_frame, "Test Mode: Click to check score", (20, 50), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                cv2.putText(display_frame, "Drag lines | 'b': BG | 'a': Auto-detect", (20, 80), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
-                cv2.putText(display_frame, "Press 'c' to clear calibration", (20, 105), 
+            if not active:
+                cv2.putText(display_frame, "Idle - waiting for motion", (20, display_frame.shape[0] - 20),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
 
-            # 3. Draw Calibration Markers
-            if center_point:
-                color = (0, 0, 255) if dragging == 'CENTER' else (0, 255, 0)
-                cv2.drawMarker(display_frame, center_point, color, cv2.MARKER_CROSS, 20, 2)
-            
-            if center_point and board_radius:
-                color = (0, 0, 255) if dragging == 'RADIUS' else (0, 255, 0)
-                # Draw Ellipse for outer double
-                axes = (int(board_radius), int(board_radius * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes, ellipse_angle, 0, 360, color, 2)
-                
-                # Draw Ellipse for treble
-                axes_treble = (int(board_radius * treble_scale), int(board_radius * treble_scale * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes_treble, ellipse_angle, 0, 360, (255, 255, 0), 1)
-                
-                # Draw Ellipse for Outer Double
-                axes_od = (int(board_radius * outer_double_scale), int(board_radius * outer_double_scale * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes_od, ellipse_angle, 0, 360, (0, 255, 0), 1)
-
-                # Draw Ellipse for Inner Double
-                axes_id = (int(board_radius * double_scale), int(board_radius * double_scale * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes_id, ellipse_angle, 0, 360, (0, 255, 0), 1)
+            if show_allocations:
+                # Figures are from the previous frame; this one is still being measured
+                cv2.putText(display_frame, f"Alloc/frame: {meter.last / 1024:.1f} KiB | Buffers allocated: {pool.total_allocations}",
+                            (20, display_frame.shape[0] - 45), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+                cv2.putText(display_frame, quality.report(), (20, display_frame.shape[0] - 70),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
 
-                # Draw Ellipse for Outer Bull (25)
-                axes_bull = (int(board_radius * bull_scale), int(board_radius * bull_scale * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes_bull, ellipse_angle, 0, 360, (0, 0, 255), 1)
+            composite_overlay(display_frame)
 
-                # Draw Ellipse for Inner Bull (50)
-                axes_ibull = (int(board_radius * inner_bull_scale), int(board_radius * inner_bull_scale * vertical_scale))
-                cv2.ellipse(display_frame, center_point, axes_ibull, ellipse_angle, 0, 360, (0, 0, 255), 1)
-                
-                # Draw 20 Segment Direction
-                # Angle 0 (Up) + calibration_angle. 
-                # Note: In image coords, Up is -90 deg. So we draw at -90 + calibration_angle.
-                rad = math.radians(-90 + calibration_angle)
-                # We must apply the ellipse rotation to this point as well
-                # Point on un-rotated ellipse
-                px = board_radius * math.cos(rad)
-                py = board_radius * math.sin(rad) * vertical_scale
-                # Rotate by ellipse_angle
-                rad_e = math.radians(ellipse_angle)
-                end_x = int(center_point[0] + px * math.cos(rad_e) - py * math.sin(rad_e))
-                end_y = int(center_point[1] + px * math.sin(rad_e) + py * math.cos(rad_e))
-                
-                cv2.line(display_frame, center_point, (end_x, end_y), (0, 255, 255), 2)
-                cv2.putText(display_frame, "20", (end_x, end_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-                
-                # Stats
-                stats = f"Scale:{vertical_scale:.2f} | Trb:{treble_scale:.2f} | Dbl:{double_scale:.2f}-{outer_double_scale:.2f} | Bull:{inner_bull_scale:.3f}-{bull_scale:.3f}"
-                cv2.putText(display_frame, stats, (20, 170), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            cv2.imshow("Debug Camera", display_frame)
 
-            # 4. Draw Last Test Click
-            if last_click:
-                cv2.circle(display_frame, last_click, 5, (255, 0, 255), -1)
-                cv2.putText(display_frame, f"Score: {last_score}", (last_click[0]+10, last_click[1]), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
+        if show_allocations:
+            meter.stop()
+        else:
+            meter.close()
 
-            cv2.imshow("Debug Camera", display_frame)
+        # Idle frames are cheap by design and would make the controller step up
+        if active and quality.update(time.perf_counter() - started):
+            width, height = quality.capture_size
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            print(quality.report())
 
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
+        key = cv2.waitKey(gate.wait_ms) & 0xFF
+        if key != 0xFF:
+            gate.wake()
+        if not handle_key(key, ctx):
             break
-        elif key == ord('c'):
-            center_point = None
-            board_radius = None
-            background_frame = None
-            print("Calibration cleared.")
-        elif key == ord('b'):
-            background_frame = frame.copy()
-            print("Background captured.")
-        elif key == ord(']'):
-            vertical_scale += 0.01
-        elif key == ord('['):
-            vertical_scale = max(0.1, vertical_scale - 0.01)
-        elif key == ord('='):
-            treble_scale += 0.01
-        elif key == ord('-'):
-            treble_scale -= 0.01
-        elif key == ord('1'):
-            inner_bull_scale = max(0.005, inner_bull_scale - 0.002)
-        elif key == ord('2'):
-            inner_bull_scale += 0.002
-        elif key == ord('3'):
-            bull_scale = max(inner_bull_scale, bull_scale - 0.002)
-        elif key == ord('4'):
-            bull_scale += 0.002
-        elif key == ord('5'):
-            double_scale = max(0.01, double_scale - 0.005)
-        elif key == ord('6'):
-            double_scale = min(outer_double_scale, double_scale + 0.005)
-        elif key == ord('7'):
-            outer_double_scale = max(double_scale, outer_double_scale - 0.005)
-        elif key == ord('8'):
-            outer_double_scale += 0.005
-        elif key == ord('.'):
-            calibration_angle += 1.0
-        elif key == ord(','):
-            calibration_angle -= 1.0
-        elif key == ord('t'):
-            show_threshold = not show_threshold
-        elif key == ord('0'):
-            ellipse_angle += 1.0
-        elif key == ord('9'):
-            ellipse_angle -= 1.0
-        elif key == ord('a'):
-            c, r, v, a = auto_detect_board(frame)
-            if c is not None:
-                center_point = c
-                board_radius = r
-                vertical_scale = v
-                ellipse_angle = a
-                
-                # Reset ring scales to standard dartboard ratios
-                treble_scale = 0.606      # 103/170 (Center of treble)
-                double_scale = 0.953      # 162/170 (Inner double)
-                outer_double_scale = 1.0  # 170/170 (Outer double)
-                inner_bull_scale = 0.0374 # 6.35/170
-                bull_scale = 0.0935       # 15.9/170
-                
-                print(f"Auto-detected: Center={c}, Radius={r:.1f}, Scale={v:.2f}, Angle={a:.1f}")
-                print("Ring areas reset to standard dartboard dimensions.")
-            else:
-                print("Auto-detection failed. Try adjusting lighting or camera angle.")
+
+    meter.close()
 
     cap.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,238 @@
+import time
+import tracemalloc
+import weakref
+
+import cv2
+import numpy as np
+
+
+class BufferPool:
+    """
+    Named arrays reused from frame to frame, so a steady camera loop allocates no
+    image memory. allocations counts every time a buffer had to be created, which
+    only happens on the first frame or when the resolution changes.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._children = {}
+        self.allocations = 0
+
+    def child(self, name):
+        """A separate pool (e.g. for rectified frames) whose allocations are counted here too."""
+        pool = self._children.get(name)
+        if pool is None:
+            pool = self._children[name] = BufferPool()
+        return pool
+
+    @property
+    def total_allocations(self):
+        return self.allocations + sum(pool.total_allocations for pool in self._children.values())
+
+    def get(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(shape, dtype=dtype)
+            self.allocations += 1
+        return buf
+
+
+class AllocationMeter:
+    """
+    Measures how much memory a stretch of code allocates (the tracemalloc peak above
+    where it started), e.g. one iteration of a frame loop. Tracing slows everything
+    down, so only run it while you're looking at the numbers.
+    """
+
+    def __init__(self):
+        self.last = 0
+        self._started_tracing = False
+        self._base = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        """Returns the bytes allocated since start()."""
+        _, peak = tracemalloc.get_traced_memory()
+        self.last = peak - self._base
+        return self.last
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+class FrameContext:
+    """
+    A captured BGR frame plus the derived images the detectors use (gray, blurred,
+    adaptive threshold, background diff), each computed at most once. Pass the same
+    context to every consumer of a frame so that turning on the threshold view,
+    auto-detection and dart detection together doesn't repeat the preprocessing.
+
+    With a BufferPool the derived images are written into the pool's buffers, so
+    they are only valid until the next frame using the same pool; copy anything
+    that has to outlive the frame. The frame must not be drawn on while the
+    context is in use; draw on a copy.
+    """
+
+    def __init__(self, image, pool=None):
+        self.image = image
+        self.pool = pool
+        self._cache = {}
+
+    @classmethod
+    def of(cls, frame):
+        """Returns frame if it already is a context, otherwise wraps it."""
+        return frame if isinstance(frame, cls) else cls(frame)
+
+    @classmethod
+    def from_gray(cls, gray):
+        """A context that only has a gray image, which is all a background needs."""
+        ctx = cls(None)
+        ctx._cache["gray"] = gray
+        return ctx
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    def _memo(self, key, compute):
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = compute()
+        return value
+
+    def _dst(self, key, shape):
+        """Output buffer for a derived image, or None to let OpenCV allocate one."""
+        return self.pool.get(key, shape) if self.pool is not None else None
+
+    @property
+    def gray(self):
+        return self._memo("gray", lambda: cv2.cvtColor(
+            self.image, cv2.COLOR_BGR2GRAY, dst=self._dst("gray", self.shape[:2])))
+
+    def blurred(self, ksize=7):
+        key = ("blurred", ksize)
+        return self._memo(key, lambda: cv2.GaussianBlur(
+            self.gray, (ksize, ksize), 0, dst=self._dst(key, self.shape[:2])))
+
+    def adaptive_threshold(self, block_size=11, c=2, ksize=7):
+        """Inverted Gaussian adaptive threshold of the blurred frame (board edges and wires are white)."""
+        key = ("adaptive", block_size, c, ksize)
+        return self._memo(key, lambda: cv2.adaptiveThreshold(
+            self.blurred(ksize), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, block_size, c,
+            dst=self._dst(key, self.shape[:2])))
+
+    def diff(self, background):
+        """Absolute gray difference from another FrameContext."""
+        # Only the latest background is remembered, by weak reference, so a frame that
+        # later becomes the background doesn't keep a chain of older frames alive.
+        cached = self._cache.get("diff")
+        if cached is not None and cached[0]() is background:
+            return cached[1]
+        diff = cv2.absdiff(background.gray, self.gray, dst=self._dst("diff", self.shape[:2]))
+        self._cache["diff"] = (weakref.ref(background), diff)
+        for key in [k for k in self._cache if isinstance(k, tuple) and k[0] == "changed"]:
+            del self._cache[key]
+        return diff
+
+    def changed(self, background, threshold=30):
+        """Binary mask of pixels that differ from background by more than threshold."""
+        diff = self.diff(background)
+        key = ("changed", threshold)
+        return self._memo(key, lambda: cv2.threshold(
+            diff, threshold, 255, cv2.THRESH_BINARY, dst=self._dst(key, diff.shape))[1])
+
+    def rectified(self, rectifier):
+        """This frame warped face-on by a rectify.Rectifier, as a FrameContext of its own."""
+        def compute():
+            if self.image is None:
+                # A background: only its gray image exists
+                return FrameContext.from_gray(rectifier.rectify(self.gray))
+            pool = self.pool.child("rectified") if self.pool is not None else None
+            image = rectifier.rectify(self.image, dst=self._dst("rectified", (rectifier.size, rectifier.size, 3)))
+            return FrameContext(image, pool)
+        return self._memo(("rectified", rectifier), compute)
+
+    def scaled(self, scale):
+        """This frame resized by scale for cheaper processing, as a FrameContext of its own."""
+        if scale == 1:
+            return self
+
+        def compute():
+            height, width = self.gray.shape if self.image is None else self.shape[:2]
+            size = (round(width * scale), round(height * scale))
+            if self.image is None:
+                return FrameContext.from_gray(cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA))
+            pool = self.pool.child(("scaled", scale)) if self.pool is not None else None
+            image = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA,
+                               dst=self._dst(("scaled", scale), (size[1], size[0], 3)))
+            return FrameContext(image, pool)
+        return self._memo(("scaled", scale), compute)
+
+    def thumbnail(self, width=128):
+        """Tiny gray copy of the frame for cheap whole-scene checks."""
+        def compute():
+            height = max(1, round(self.shape[0] * width / self.shape[1]))
+            # Subsample to twice the target first; area-averaging the full frame
+            # costs more than the check is meant to save
+            sampled = cv2.resize(self.image, (width * 2, height * 2), interpolation=cv2.INTER_NEAREST,
+                                 dst=self._dst(("thumbnail_sampled", width), (height * 2, width * 2, 3)))
+            small = cv2.resize(sampled, (width, height), interpolation=cv2.INTER_AREA,
+                               dst=self._dst(("thumbnail_bgr", width), (height, width, 3)))
+            return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._dst(("thumbnail", width), (height, width)))
+        return self._memo(("thumbnail", width), compute)
+
+
+class MotionGate:
+    """
+    Decides whether a frame is worth running the detectors on by diffing a tiny
+    thumbnail against the previous one. After idle_after seconds without motion the
+    gate closes and callers should poll at idle_interval; the first frame that shows
+    motion (or a call to wake()) opens it again.
+    """
+
+    def __init__(self, threshold=20, min_pixels=2, idle_after=2.0, idle_interval=0.25, width=128):
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.width = width
+        self.previous = None
+        self._diff = None
+        self.last_motion = None
+        self.active = True
+
+    def wake(self, now=None):
+        self.last_motion = time.monotonic() if now is None else now
+        self.active = True
+
+    def update(self, ctx, now=None):
+        """Feeds the next frame. Returns True when the full pipeline should run on it."""
+        now = time.monotonic() if now is None else now
+        tiny = ctx.thumbnail(self.width)
+        if self.previous is None or self.previous.shape != tiny.shape:
+            moving = True
+            self.previous = tiny.copy()
+            self._diff = np.empty_like(tiny)
+        else:
+            cv2.absdiff(tiny, self.previous, dst=self._diff)
+            cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+            moving = cv2.countNonZero(self._diff) >= self.min_pixels
+            # The thumbnail may live in a pooled buffer, so keep a copy of our own
+            np.copyto(self.previous, tiny)
+        if moving:
+            self.last_motion = now
+        self.active = now - self.last_motion < self.idle_after
+        return self.active
+
+    @property
+    def wait_ms(self):
+        """How long the loop should wait for a key before reading the next frame."""
+        return 1 if self.active else int(self.idle_interval * 1000)
@@ -0,0 +1,163 @@
+import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from debug_camera import auto_detect_board, detect_darts
+from frame_context import FrameContext
+from scoring_logic import get_score_from_coords
+
+# OpenCV releases the GIL for the heavy lifting, so real OS threads are enough
+# to keep frame scoring off the request handlers.
+FRAME_WORKERS = int(os.environ.get("FRAME_WORKERS", os.cpu_count() or 2))
+_executor = None
+
+# Once the board is calibrated the client only uploads the board: a square this many
+# board radii around the centre, scaled to ROI_SIZE px across. A view is (roi, size):
+# roi as (x, y, w, h) fractions of the calibrated frame, size as (width, height) px.
+ROI_MARGIN = 1.4
+ROI_SIZE = 512
+FULL_FRAME = (0.0, 0.0, 1.0, 1.0)
+
+# detect_darts' min_area at the calibrated frame's scale
+DART_MIN_AREA = 50
+
+
+def offload(fn, *args):
+    """
+    Runs fn(*args) on a worker thread and waits for the result. Under gevent the
+    hub's native threadpool is used so only the calling greenlet waits.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched("threading"):
+            import gevent
+            return gevent.get_hub().threadpool.apply(fn, args)
+    except ImportError:
+        pass
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=FRAME_WORKERS, thread_name_prefix="frame")
+    return _executor.submit(fn, *args).result()
+
+
+def decode_image(data):
+    """
+    Decodes a JPEG/PNG upload, either raw bytes or a base64 data URL, to a
+    FrameContext, so calibration and scoring share its preprocessing.
+    """
+    if isinstance(data, str):
+        if "," in data:
+            data = data.split(",", 1)[1]
+        data = base64.b64decode(data)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return FrameContext(image)
+
+
+def calibrate_frame(frame):
+    """Auto-detects the board and returns a calibration dict, or None if no board was found."""
+    center, radius, v_scale, angle = auto_detect_board(frame)
+    if center is None:
+        return None
+    return {
+        "center": center,
+        "board_radius": radius,
+        "vertical_scale": v_scale,
+        "ellipse_angle": angle,
+        "calibration_angle": 0.0,
+        "frame_size": (frame.shape[1], frame.shape[0]),
+    }
+
+
+def board_roi(calibration, margin=ROI_MARGIN):
+    """The square around the board, clipped to the frame, as (x, y, w, h) fractions of the calibrated frame."""
+    fw, fh = calibration["frame_size"]
+    cx, cy = calibration["center"]
+    half = calibration["board_radius"] * margin
+    x0, y0 = max(0.0, cx - half), max(0.0, cy - half)
+    x1, y1 = min(fw, cx + half), min(fh, cy + half)
+    return (float(x0 / fw), float(y0 / fh), float((x1 - x0) / fw), float((y1 - y0) / fh))
+
+
+def parse_roi(value):
+    """Reads a roi sent by the client, as "x,y,w,h" or a list. Raises ValueError."""
+    if isinstance(value, str):
+        value = value.split(",")
+    x, y, w, h = (float(v) for v in value)
+    if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 - x + 1e-6 and 0 < h <= 1 - y + 1e-6):
+        raise ValueError("Crop must lie inside the frame")
+    return (x, y, w, h)
+
+
+def view_scale(calibration, view):
+    """Pixels in view per pixel of the calibrated frame, as (x, y)."""
+    (_, _, w, h), (width, height) = view
+    fw, fh = calibration["frame_size"]
+    return width / (w * fw), height / (h * fh)
+
+
+def view_calibration(calibration, view):
+    """
+    The calibration (made on a full frame) for frames showing view. The crop has to
+    keep the frame's pixel aspect, since the board ellipse is only scaled, not reshaped.
+    """
+    sx, sy = view_scale(calibration, view)
+    if abs(sx / sy - 1) > 0.02:
+        raise ValueError("Uploads must keep the camera's aspect ratio")
+    (x, y, _, _), size = view
+    fw, fh = calibration["frame_size"]
+    cx, cy = calibration["center"]
+    return dict(calibration, center=((cx - x * fw) * sx, (cy - y * fh) * sy),
+                board_radius=calibration["board_radius"] * sx, frame_size=tuple(size))
+
+
+def view_to_frame(calibration, view, point):
+    """Maps a point in view pixels back to the calibrated full frame."""
+    sx, sy = view_scale(calibration, view)
+    (x, y, _, _), _ = view
+    fw, fh = calibration["frame_size"]
+    return (point[0] / sx + x * fw, point[1] / sy + y * fh)
+
+
+def convert_background(background, from_view, to_view):
+    """
+    The background, captured for from_view, as seen in to_view's pixels: for when the
+    client switches between full frames and board crops or changes its upload size.
+    Anything to_view shows that from_view didn't is black.
+    """
+    (ax, ay, aw, ah), (a_width, a_height) = from_view
+    (bx, by, bw, bh), (b_width, b_height) = to_view
+    if (ax, ay, aw, ah) == (bx, by, bw, bh):
+        gray = cv2.resize(background.gray, (b_width, b_height), interpolation=cv2.INTER_AREA)
+    else:
+        kx = aw / a_width * b_width / bw
+        ky = ah / a_height * b_height / bh
+        matrix = np.float32([[kx, 0, (ax - bx) * b_width / bw], [0, ky, (ay - by) * b_height / bh]])
+        gray = cv2.warpAffine(background.gray, matrix, (b_width, b_height), flags=cv2.INTER_LINEAR)
+    return FrameContext.from_gray(gray)
+
+
+def score_frame(frame, background, calibration, min_area=DART_MIN_AREA):
+    """
+    Finds the new dart between background and frame and scores it.
+    Returns (score, (x, y)), or (None, None) if nothing changed.
+    """
+    darts = detect_darts(frame, background, min_area)
+    if not darts:
+        return None, None
+
+    # The newest dart is the largest changed region
+    _, (x, y) = max(darts, key=lambda d: cv2.contourArea(d[0]))
+    cx, cy = calibration["center"]
+    score = get_score_from_coords(
+        x, y, cx, cy, calibration["board_radius"],
+        vertical_scale=calibration["vertical_scale"],
+        calibration_angle=calibration["calibration_angle"],
+        ellipse_angle=calibration["ellipse_angle"]
+    )
+    return score, (x, y)
@@ -1,103 +1,210 @@
+import re
 import tkinter as tk
 from DartsGame import DartsGame
 from MainGame import parse_score
 
-#Initialize shite
-root = tk.Tk()  # Initialize the root window first
-root.title("Checkout 26")
-root.geometry("400x600")
-game = None
-current_multiplier = tk.StringVar(value="S")  # Create StringVar after initializing root
-
-#------------ Screen management --------------
-def clear_screen():
-    for widget in root.winfo_children():
-        widget.destroy()
-
-#------------ Start Screen --------------
-def start_screen():
-    clear_screen()
-    tk.Label(root, text="welcome to Checkout 26", font=("Arial", 24)).pack(pady=20)
-    tk.Label(root, text="Player Name:").pack()
-    name_entry = tk.Entry(root, font=("Arial", 14))
-    name_entry.pack(pady=5)
-    tk.Label(root, text="Starting Score:").pack()
-    start_score_var = tk.IntVar(value=501)
-    tk.OptionMenu(root, start_score_var, 301, 501).pack(pady=5)
-    def start_game():
-        global game
-        name = name_entry.get().strip() or "Player"
-        game = DartsGame(start_score=start_score_var.get())
-        game_screen()
-    tk.Button(root, text="Start Game", font=("Arial", 14),
-              command=start_game).pack(pady=20)
-#------------ Game Screen --------------
-def game_screen():
-    clear_screen()
-    score_label = tk.Label(root, font=("Arial", 32))
-    score_label.pack(pady=10)
-
-    player_label = tk.Label(root, font=("Arial", 16))
-    player_label.pack()
-
-    avg_label = tk.Label(root, font=("Arial", 14))
-    avg_label.pack()
-
-    turn_label = tk.Label(root, font=("Arial", 12))
-    turn_label.pack(pady=5)
-
-    status_label = tk.Label(root, font=("Arial", 14), fg="red")
-    status_label.pack()
-
-
-    def refresh():
-        score_label.config(text=f"Score: {game.score}")
-        turn_label.config(text=f"Darts this turn: {', '.join(game.turn_darts)}")
-        avg_label.config(text=f"Average: {game.average():.2f}")
-        turn_label.config(text=f"Turn: "+", ".join(game.turn_darts))
-
-    def throw_dart(value):
-        if value not in ["MISS", "25", "50"]:
-            dart = f"{current_multiplier.get()}{value}"
+STATUS_TEXT = {"WIN": "🎯 GAME SHOT!", "BUST": "BUST!", "NO_DOUBLE": "No Double!"}
+
+# Typed shorthands for darts parse_score doesn't take as they are
+DART_ALIASES = {"BULL": "50", "DB": "50", "D25": "50", "SB": "25", "OB": "25", "M": "MISS", "0": "MISS"}
+
+
+def normalize_dart(text):
+    """Turns typed input ("t20", "s5", "bull", "m") into a dart for DartsGame.throw. Raises ValueError."""
+    dart = text.strip().upper()
+    dart = DART_ALIASES.get(dart, dart)
+    if dart.startswith("S") and dart[1:].isdigit():
+        dart = dart[1:]
+    parse_score(dart)
+    return dart
+
+
+#------------ View model --------------
+class GameViewModel:
+    """
+    What the game screen shows, as the text of each label, plus the actions that
+    change it. Knows nothing about Tk, so the screen can redraw only the labels
+    whose text changed.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.status = ""
+
+    def throw(self, dart):
+        game = self.game
+        if game.score == 0:
+            self.status = "Leg over - start a new game"
+            return None
+        result, is_180 = game.throw(dart)
+        self.status = "180!" if is_180 else STATUS_TEXT.get(result, "")
+        return result
+
+    def undo(self):
+        self.game.undo_last_dart()
+        self.status = ""
+
+    def fields(self):
+        game = self.game
+        if game.current_turn or not game.turns:
+            turn = "Turn: " + ", ".join(d["input"] for d in game.current_turn)
         else:
-            dart = value
+            last = game.turns[-1]
+            turn = f"Last turn: {', '.join(d['input'] for d in last if d['input'])}"
+            if last[0]["input"] != "BUST":
+                turn += f" ({sum(d['score'] for d in last)})"
+        suggestion = game.checkout_suggestion()
+        return {
+            "player": game.name,
+            "score": f"Score: {game.score}",
+            "average": f"Average: {game.average():.2f}",
+            "turn": turn,
+            "suggestion": f"Checkout: {' '.join(suggestion)}" if suggestion else "",
+            "status": self.status,
+        }
+
+
+#------------ App --------------
+class DartsApp:
+    """
+    Both screens are built once and swapped in and out. Changes only request a
+    redraw; the redraw runs once the pending input has been handled, so several
+    darts entered quickly cost one update of the labels that actually changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        root.title("Checkout 26")
+        root.geometry("400x600")
+        self.model = None
+        self.multiplier = tk.StringVar(value="S")
+        self.labels = {}
+        self.shown = {}
+        self.redraw_pending = False
+        self.start_frame = self.build_start_screen()
+        self.game_frame = self.build_game_screen()
+        root.bind("<Control-z>", lambda e: self.undo())
+        self.show(self.start_frame)
+
+    def show(self, frame):
+        for f in (self.start_frame, self.game_frame):
+            f.pack_forget()
+        frame.pack(fill="both", expand=True)
+
+    #------------ Start Screen --------------
+    def build_start_screen(self):
+        frame = tk.Frame(self.root)
+        tk.Label(frame, text="welcome to Checkout 26", font=("Arial", 24)).pack(pady=20)
+        tk.Label(frame, text="Player Name:").pack()
+        self.name_entry = tk.Entry(frame, font=("Arial", 14))
+        self.name_entry.pack(pady=5)
+        tk.Label(frame, text="Starting Score:").pack()
+        self.start_score = tk.IntVar(value=501)
+        tk.OptionMenu(frame, self.start_score, 301, 501).pack(pady=5)
+        tk.Button(frame, text="Start Game", font=("Arial", 14), command=self.start_game).pack(pady=20)
+        self.name_entry.bind("<Return>", lambda e: self.start_game())
+        return frame
+
+    def start_game(self):
+        name = self.name_entry.get().strip() or "Player"
+        self.model = GameViewModel(DartsGame(name, start_score=self.start_score.get()))
+        self.multiplier.set("S")
+        self.redraw()
+        self.show(self.game_frame)
+        self.dart_entry.focus_set()
+
+    #------------ Game Screen --------------
+    def build_game_screen(self):
+        frame = tk.Frame(self.root)
+        for key, font, pady in [("score", ("Arial", 32), 10), ("player", ("Arial", 16), 0),
+                                ("average", ("Arial", 14), 0), ("turn", ("Arial", 12), 5),
+                                ("suggestion", ("Arial", 12), 0)]:
+            self.labels[key] = tk.Label(frame, font=font)
+            self.labels[key].pack(pady=pady)
+        self.labels["status"] = tk.Label(frame, font=("Arial", 14), fg="red")
+        self.labels["status"].pack()
+
+        # Keyboard entry: "t20", "d16", "25", "bull", "m"; several separated by spaces
+        self.dart_entry = tk.Entry(frame, font=("Arial", 16), justify="center")
+        self.dart_entry.pack(pady=5)
+        self.dart_entry.bind("<Return>", lambda e: self.enter_darts())
+        self.dart_entry.bind("<Escape>", lambda e: self.dart_entry.delete(0, "end"))
+
+        # Multipliers
+        mult_frame = tk.Frame(frame)
+        mult_frame.pack(pady=10)
+        for m in ["S", "D", "T"]:
+            tk.Radiobutton(mult_frame, text=m, value=m, variable=self.multiplier, indicatoron=False,
+                           width=10, height=2, font=("Arial", 16)).pack(side="left", padx=5, pady=5)
+
+        # Number buttons
+        num_frame = tk.Frame(frame)
+        num_frame.pack(pady=10)
+        for i in range(1, 21):
+            tk.Button(num_frame, text=str(i), width=8, height=3, font=("Arial", 16),
+                      command=lambda x=i: self.throw_number(x)
+                      ).grid(row=(i-1)//5, column=(i-1)%5, padx=5, pady=5)
+
+        # Specials
+        special_frame = tk.Frame(frame)
+        special_frame.pack(pady=10)
+        for s in ["25", "50", "MISS"]:
+            tk.Button(special_frame, text=s, width=10, height=2, font=("Arial", 16),
+                      command=lambda x=s: self.throw(x)).pack(side="left", padx=5, pady=5)
+        tk.Button(special_frame, text="Undo", width=10, height=2, font=("Arial", 16),
+                  command=self.undo).pack(side="left", padx=5, pady=5)
+        tk.Button(frame, text="New Game", command=lambda: self.show(self.start_frame)).pack(pady=5)
+        return frame
+
+    def throw_number(self, number):
+        multiplier = self.multiplier.get()
+        self.throw(f"{multiplier}{number}" if multiplier != "S" else str(number))
+
+    def throw(self, dart):
+        self.model.throw(dart)
+        self.request_redraw()
+
+    def undo(self):
+        if self.model is not None:
+            self.model.undo()
+            self.request_redraw()
+
+    def enter_darts(self):
+        text = self.dart_entry.get()
+        self.dart_entry.delete(0, "end")
+        for token in re.split(r"[\s,]+", text.strip()):
+            if not token:
+                continue
+            try:
+                dart = normalize_dart(token)
+            except ValueError:
+                self.model.status = f"Unknown dart: {token}"
+                break
+            if self.model.throw(dart) is None:
+                break
+        self.request_redraw()
+
+    #------------ Redraw --------------
+    def request_redraw(self):
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_pending = False
+        for key, text in self.model.fields().items():
+            if self.shown.get(key) != text:
+                self.labels[key].config(text=text)
+                self.shown[key] = text
 
-        result = game.throw(dart)
-        refresh()
 
-        if result == "WIN":
-            status_label.config(text="🎯 GAME SHOT!")
-        elif result == "BUST":
-            status_label.config(text="BUST!")
-        else:
-            status_label.config(text="")
-
-    # Multipliers
-    mult_frame = tk.Frame(root)
-    mult_frame.pack(pady=10)
-    for m in ["S", "D", "T"]:
-        tk.Button(mult_frame, text=m, width=10, height=2, font=("Arial", 16),
-                  command=lambda x=m: current_multiplier.set(x)).pack(side="left", padx=5, pady=5)
-
-    # Number buttons
-    num_frame = tk.Frame(root)
-    num_frame.pack(pady=10)
-
-    for i in range(1, 21):
-        tk.Button(num_frame, text=str(i), width=8, height=3, font=("Arial", 16),
-                  command=lambda x=i: throw_dart(str(x))
-                  ).grid(row=(i-1)//5, column=(i-1)%5, padx=5, pady=5)
-
-    # Specials
-    special_frame = tk.Frame(root)
-    special_frame.pack(pady=10)
-    for s in ["25", "50", "MISS"]:
-        tk.Button(special_frame, text=s, width=10, height=2, font=("Arial", 16),
-                  command=lambda x=s: throw_dart(x)).pack(side="left", padx=5, pady=5)
+# ---------- Start App ----------
 
-    refresh()
+def main():
+    root = tk.Tk()
+    DartsApp(root)
+    root.mainloop()
 
-# ---------- Start App ----------
 
-start_screen()
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
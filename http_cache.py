@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_TYPES = ("text/html", "application/json", "text/css", "application/javascript", "text/javascript")
+
+# Static files with a matching ?v= hash never change at that URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_hashes = {}       # path -> (mtime, hash)
+_compressed = {}   # (path, hash, encoding) -> bytes
+
+
+def static_hash(app, filename):
+    """Short content hash of a static file, recomputed only when the file changes."""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _hashes.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = _hashes[path] = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+    return cached[1]
+
+
+def not_modified(etag):
+    """True if the request already holds the representation with this (weak) ETag."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def compress_response(app, response):
+    """Compresses HTML, JSON and text assets for clients that accept it (brotli if installed, else gzip)."""
+    response.vary.add("Accept-Encoding")
+    static = request.endpoint == "static"
+    # Static files come back as file streams; anything else streamed (e.g. the event stream) is left alone
+    if (response.status_code != 200 or (response.is_streamed and not static)
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    # Static files are sent straight from disk; read them in to compress
+    response.direct_passthrough = False
+    if static:
+        # ... and compress each version only once
+        filename = request.view_args["filename"]
+        key = (filename, static_hash(app, filename), encoding)
+        body = _compressed.get(key)
+        if body is None:
+            body = _compressed[key] = _compress(response.get_data(), encoding)
+        else:
+            response.close()  # the file was never read
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        body = _compress(data, encoding)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # The bytes differ per encoding, so only a weak validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Adds hashed static URLs, immutable caching for them and response compression."""
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            digest = static_hash(app, values["filename"])
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def cache_and_compress(response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            if request.args.get("v") == static_hash(app, request.view_args["filename"]):
+                response.headers["Cache-Control"] = IMMUTABLE
+            else:
+                response.headers["Cache-Control"] = "no-cache"
+        return compress_response(app, response)
@@ -0,0 +1,204 @@
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DART_INPUTS = ["T20", "20", "5", "1", "T19", "19", "D16", "D20", "D8", "25", "50", "MISS"]
+
+
+class TestClientTransport:
+    """Drives the app in-process through Flask's test client (one client per simulated board)."""
+
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("Location", ""), len(response.get_data())
+
+
+class HttpTransport:
+    """Drives a running server over HTTP with its own cookie jar (one per simulated board)."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            self._NoRedirect
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                return response.status, response.headers.get("Location", ""), len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Location", ""), len(e.read())
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = 0
+        self.bytes = 0
+
+    def timed(self, transport, name, method, path, data=None):
+        start = time.perf_counter()
+        status, location, size = transport.request(method, path, data)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            self.bytes += size
+            if status >= 400:
+                self.errors += 1
+        return status, location
+
+
+def play_match(transport, recorder, rng, players, start_score, rate, max_darts, stop):
+    """Plays one simulated match through the real routes."""
+    recorder.timed(transport, "GET /", "GET", "/")
+    recorder.timed(transport, "POST /", "POST", "/", {
+        "names": ", ".join(players), "start_score": start_score, "best_of": 1, "game_type": "x01"
+    })
+
+    in_turn = 0  # darts thrown in the current visit
+    for _ in range(max_darts):
+        if stop.is_set():
+            break
+        recorder.timed(transport, "GET /game", "GET", "/game")
+        _, location = recorder.timed(transport, "throw", "POST", "/game",
+                                     {"action": "throw", "dart": rng.choice(DART_INPUTS)})
+        in_turn = 0 if "transition=" in location else in_turn + 1
+        if rng.random() < 0.03:
+            recorder.timed(transport, "undo", "POST", "/game", {"action": "undo"})
+            in_turn = max(in_turn - 1, 0)
+        if "status=" in location:
+            break
+        # Now and then a visit is cut short after the first or second dart
+        if in_turn and rng.random() < 0.05:
+            recorder.timed(transport, "next_turn", "POST", "/game", {"action": "next_turn"})
+            in_turn = 0
+        if rate:
+            time.sleep(rng.expovariate(rate))
+
+    recorder.timed(transport, "export", "POST", "/game", {"action": "export"})
+    if rng.random() < 0.5:
+        recorder.timed(transport, "/restart", "GET", "/restart")
+    recorder.timed(transport, "/quit", "GET", "/quit")
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run(boards, duration, rate, start_score, max_darts, seed, url=None):
+    if url is None:
+        os.environ.setdefault("DARTS_HISTORY_DB", os.path.join(tempfile.gettempdir(), "darts_load_history.db"))
+        import app
+        tracemalloc.start()
+        games_before = len(app.games)
+        mem_before, _ = tracemalloc.get_traced_memory()
+
+    recorder = Recorder()
+    stop = threading.Event()
+    matches = [0] * boards
+
+    def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        transport = HttpTransport(url) if url else TestClientTransport()
+        while not stop.is_set():
+            play_match(transport, recorder, rng, [f"Board{i} A", f"Board{i} B"], start_score, rate, max_darts, stop)
+            matches[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(boards)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    result = {
+        "boards": boards,
+        "duration_s": elapsed,
+        "requests": len(all_latencies),
+        "throughput_rps": len(all_latencies) / elapsed,
+        "darts_per_s": len(recorder.latencies.get("throw", [])) / elapsed,
+        "matches": sum(matches),
+        "errors": recorder.errors,
+        "bytes": recorder.bytes,
+        "routes": {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+
+    if url is None:
+        mem_after, mem_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["games_left"] = len(app.games) - games_before
+        result["memory_growth_bytes"] = mem_after - mem_before
+        result["memory_peak_bytes"] = mem_peak
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the darts Flask app")
+    parser.add_argument("--boards", type=int, default=8, help="Concurrent simulated matches")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--rate", type=float, default=0.0, help="Darts per second per board (0 = as fast as possible)")
+    parser.add_argument("--start-score", type=int, default=501)
+    parser.add_argument("--max-darts", type=int, default=300, help="Darts per match before giving up on the leg")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process test client)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    result = run(args.boards, args.duration, args.rate, args.start_score, args.max_darts, args.seed, args.url)
+
+    print(f"{result['boards']} boards, {result['duration_s']:.1f}s: {result['requests']} requests "
+          f"({result['throughput_rps']:.1f}/s), {result['darts_per_s']:.1f} darts/s, "
+          f"{result['matches']} matches, {result['errors']} errors")
+    print(f"{'route':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in result["routes"].items():
+        print(f"{name:<12}{r['count']:>8}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    if "memory_growth_bytes" in result:
+        print(f"games left behind: {result['games_left']}, memory growth: {result['memory_growth_bytes'] / 1024:.1f} KiB, "
+              f"peak: {result['memory_peak_bytes'] / 1024:.1f} KiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
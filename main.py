@@ -1,6 +1,12 @@
+import argparse
+import json
+import sys
+
 from DartsGame import DartsGame
+from player_history import leg_stats
+
 
-def main():
+def interactive():
     game = DartsGame()
 
     print("Welcome to the Darts Game! Starting score is 501.")
@@ -14,5 +20,158 @@ def main():
         except ValueError as e:
             print(e)
     print("game shot")
+
+
+def parse_line(line):
+    """
+    Returns (match, leg, player, dart, start_score) for one input line: either a bare
+    dart ("T20") or NDJSON like {"match": "m1", "leg": 2, "player": "Ann", "dart": "T20"}.
+    Missing ids are None (the player defaults to "Player").
+    """
+    if line.startswith("{"):
+        data = json.loads(line)
+        if "dart" not in data:
+            raise ValueError("missing \"dart\"")
+        match, leg, player, start_score = (data.get("match"), data.get("leg"),
+                                           data.get("player", "Player"), data.get("start_score"))
+        for field, value in (("match", match), ("leg", leg)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int))):
+                raise ValueError(f"\"{field}\" must be a string or an integer")
+        if not isinstance(player, str):
+            raise ValueError("\"player\" must be a string")
+        if start_score is not None and (isinstance(start_score, bool) or not isinstance(start_score, int)
+                                        or start_score <= 0):
+            raise ValueError("\"start_score\" must be a positive integer")
+        return match, leg, player, str(data["dart"]), start_score
+    return None, None, "Player", line, None
+
+
+class BatchScorer:
+    """
+    Scores a stream of darts through DartsGame, one game per player per leg. A leg
+    is closed (its stats returned, its games dropped) as soon as someone checks out,
+    so the games held only grow with the number of legs open at once, not the log
+    length (finished legs leave just their key). Darts without a leg id go to an
+    automatically numbered leg of their match, which moves on to the next free
+    number when that leg is won; a dart for a leg id already won is an error.
+    """
+
+    def __init__(self, start_score=501):
+        self.start_score = start_score
+        self.legs = {}         # (match, leg) -> {player: DartsGame}
+        self.auto_legs = {}    # match -> current automatic leg number
+        self.closed = set()    # (match, leg) of legs already won
+        self.darts = 0
+        self.legs_finished = 0
+
+    def throw(self, match, leg, player, dart, start_score=None):
+        """Scores one dart. Returns the leg's stat records if it won the leg, else []."""
+        auto = leg is None
+        if auto:
+            leg = self.auto_legs.setdefault(match, 1)
+        elif (match, leg) in self.closed:
+            raise ValueError(f"leg {leg} of match {match} is already finished")
+        key = (match, leg)
+        players = self.legs.get(key, {})
+        game = players.get(player)
+        if game is None:
+            # Only kept once it has taken a valid dart, so a bad line leaves no empty leg behind
+            game = DartsGame(player, start_score or self.start_score)
+            result, _ = game.throw(dart)
+            self.legs[key] = players
+            players[player] = game
+        else:
+            if start_score is not None and start_score != game.start_score:
+                raise ValueError(f"start_score {start_score} conflicts with {game.start_score} "
+                                 f"already used for {player} in this leg")
+            result, _ = game.throw(dart)
+        self.darts += 1
+        if result != "WIN":
+            return []
+
+        del self.legs[key]
+        self.closed.add(key)
+        if auto:
+            while (match, leg) in self.closed:
+                leg += 1
+            self.auto_legs[match] = leg
+        self.legs_finished += 1
+        return [leg_record(match, leg, g, complete=True) for g in players.values()]
+
+    def finish(self):
+        """Stat records for legs nobody won by the end of the input."""
+        records = [leg_record(match, leg, game, complete=False)
+                   for (match, leg), players in self.legs.items() for game in players.values()]
+        self.legs.clear()
+        return records
+
+
+def leg_record(match, leg, game, complete):
+    turns = game.turns + [game.current_turn] if game.current_turn else game.turns
+    record = {"match": match, "leg": leg}
+    record.update(leg_stats(game.name, game.start_score, turns, game.checkout_attempts,
+                            game.checkouts_hit, game.score == 0))
+    record["average"] = round(record["points"] / record["darts"] * 3, 2) if record["darts"] else 0.0
+    record["remaining"] = game.score
+    record["complete"] = complete
+    return record
+
+
+def open_input(path):
+    return sys.stdin if path == "-" else open(path, encoding="utf-8")
+
+
+def batch(paths, start_score, out=sys.stdout, err=sys.stderr):
+    """Scores every dart in paths ("-" for stdin), writing one NDJSON record per player per leg. Returns the error count."""
+    scorer = BatchScorer(start_score)
+    errors = 0
+    for path in paths:
+        try:
+            f = open_input(path)
+        except OSError as e:
+            errors += 1
+            print(f"{path}: {e.strerror or e}", file=err)
+            continue
+        try:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    records = scorer.throw(*parse_line(line))
+                except ValueError as e:
+                    # json.JSONDecodeError is a ValueError too
+                    errors += 1
+                    print(f"{path}:{line_no}: {e}", file=err)
+                    continue
+                for record in records:
+                    out.write(json.dumps(record) + "\n")
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    unfinished = scorer.finish()
+    for record in unfinished:
+        out.write(json.dumps(record) + "\n")
+    out.flush()
+    print(f"Scored {scorer.darts} darts: {scorer.legs_finished} legs finished, "
+          f"{len({(r['match'], r['leg']) for r in unfinished})} unfinished, {errors} errors", file=err)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a 501 leg, or score logged darts in batch")
+    parser.add_argument("--batch", nargs="*", metavar="FILE",
+                        help="Score darts from files (default stdin), one per line as a bare dart or NDJSON "
+                             "with match/leg/player/dart, and print per-leg NDJSON stats")
+    parser.add_argument("--start-score", type=int, default=501, help="Start score for batch legs")
+    args = parser.parse_args(argv)
+
+    if args.batch is None:
+        interactive()
+        return 0
+    return 1 if batch(args.batch or ["-"], args.start_score) else 0
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
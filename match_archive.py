@@ -0,0 +1,336 @@
+import json
+import mmap
+import struct
+import sys
+
+# Compact binary archive for finished matches (the output of Match.export_session).
+#
+# File layout (all little-endian):
+#   header     magic, version, match count, string count, string table offset, index offset
+#   matches    per match: match header, player records, throw records
+#   strings    u16 length + utf-8 bytes, referenced by id from player records
+#   index      one fixed-size entry per match so queries can seek without parsing bodies
+
+MAGIC = b"C26A"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIQQ")
+INDEX_ENTRY = struct.Struct("<QIBBbxI")      # offset, length, players, best_of, winner slot, throws
+MATCH_HEADER = struct.Struct("<BBBBI")       # players, best_of, current player, starting player, throws
+PLAYER = struct.Struct("<IBHHHHIIB6H")       # name id, game type, start, score, attempts, hits, first throw, throw count, winner, practice stats
+THROW = struct.Struct("<BHBBBB")             # slot, turn, value, multiplier, score, flags
+STRING_LEN = struct.Struct("<H")
+
+GAME_TYPES = ["x01", "practice_20"]
+PRACTICE_STATS = ["20", "T20", "5", "1", "12", "18"]
+
+FLAG_DOUBLE = 1
+FLAG_BUST = 2
+FLAG_PAD = 4
+
+
+def _encode_dart(dart):
+    """Returns (value, multiplier, score, flags) for an exported dart dict."""
+    s = str(dart.get("input", "")).strip().upper()
+    score = int(dart.get("score", 0))
+    flags = FLAG_DOUBLE if dart.get("is_double") else 0
+
+    if s == "BUST":
+        return 0, 0, 0, FLAG_BUST
+    if s == "":
+        return 0, 0, 0, FLAG_PAD
+    if s in ("MISS", "0"):
+        return 0, 0, 0, flags
+    if s == "50":
+        return 25, 2, 50, flags
+    if s == "25":
+        return 25, 1, 25, flags
+
+    multiplier = 1
+    if s.startswith("D"):
+        multiplier = 2
+        s = s[1:]
+    elif s.startswith("T"):
+        multiplier = 3
+        s = s[1:]
+
+    if not s.isdigit():
+        raise ValueError(f"Cannot archive dart input {dart.get('input')!r}")
+    return int(s), multiplier, score, flags
+
+
+def _decode_dart(value, multiplier, score, flags):
+    """Rebuilds the dart dict that DartsGame stores in its turns."""
+    if flags & FLAG_BUST:
+        text = "BUST"
+    elif flags & FLAG_PAD:
+        text = ""
+    elif multiplier == 0:
+        text = "MISS"
+    elif value == 25:
+        text = "50" if multiplier == 2 else "25"
+    elif multiplier == 1:
+        text = str(value)
+    else:
+        text = f"{'D' if multiplier == 2 else 'T'}{value}"
+    return {"input": text, "score": score, "is_double": bool(flags & FLAG_DOUBLE)}
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, s):
+        if s not in self.ids:
+            self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return self.ids[s]
+
+    def pack(self):
+        parts = []
+        for s in self.strings:
+            raw = s.encode("utf-8")
+            parts.append(STRING_LEN.pack(len(raw)))
+            parts.append(raw)
+        return b"".join(parts)
+
+
+def _pack_match(session, strings):
+    players = session["players"]
+    player_records = []
+    throw_records = []
+    winner_slot = -1
+
+    for slot, player in enumerate(players):
+        game_type = player.get("game_type", "x01")
+        first_throw = len(throw_records)
+
+        if game_type == "practice_20":
+            stats = [player.get("stats", {}).get(k, 0) for k in PRACTICE_STATS]
+            score = player.get("score", 0)
+            darts = player.get("total_darts_thrown", 0)
+            start = 0
+        else:
+            stats = [0] * len(PRACTICE_STATS)
+            start = player.get("start_score", 501)
+            for turn_no, turn in enumerate(player.get("turns", [])):
+                for dart in turn:
+                    throw_records.append(THROW.pack(slot, turn_no, *_encode_dart(dart)))
+            darts = len(throw_records) - first_throw
+            points = sum(
+                int(d.get("score", 0)) for t in player.get("turns", []) for d in t
+                if d.get("input") != "BUST"
+            )
+            score = start - points
+
+        is_winner = bool(player.get("is_winner"))
+        if is_winner and winner_slot < 0:
+            winner_slot = slot
+
+        player_records.append(PLAYER.pack(
+            strings.add(player.get("player", "Player")),
+            GAME_TYPES.index(game_type),
+            start,
+            score,
+            player.get("checkout_attempts", 0),
+            player.get("checkouts_hit", 0),
+            first_throw,
+            darts,
+            is_winner,
+            *stats
+        ))
+
+    header = MATCH_HEADER.pack(
+        len(players),
+        session.get("best_of", 1),
+        session.get("current_player_index", 0),
+        session.get("starting_player_index", 0),
+        len(throw_records)
+    )
+    body = header + b"".join(player_records) + b"".join(throw_records)
+    return body, winner_slot, len(throw_records)
+
+
+def write_archive(path, sessions):
+    """Writes a list of exported match sessions to a binary archive."""
+    strings = _StringTable()
+    bodies = []
+    index = []
+    offset = HEADER.size
+
+    for session in sessions:
+        body, winner_slot, n_throws = _pack_match(session, strings)
+        index.append(INDEX_ENTRY.pack(
+            offset, len(body), len(session["players"]),
+            session.get("best_of", 1), winner_slot, n_throws
+        ))
+        bodies.append(body)
+        offset += len(body)
+
+    string_blob = strings.pack()
+    strings_offset = offset
+    index_offset = strings_offset + len(string_blob)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(bodies), len(strings.strings),
+                            strings_offset, index_offset))
+        for body in bodies:
+            f.write(body)
+        f.write(string_blob)
+        f.write(b"".join(index))
+
+
+class ArchiveReader:
+    """Memory-mapped reader. Only the header, index and string table are parsed on open."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, version, _, count, n_strings, strings_offset, index_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not a match archive")
+        if version > VERSION:
+            self.close()
+            raise ValueError(f"Unsupported archive version {version}")
+
+        self.version = version
+        self.index = list(INDEX_ENTRY.iter_unpack(
+            self._view[index_offset:index_offset + count * INDEX_ENTRY.size]
+        ))
+
+        self.strings = []
+        pos = strings_offset
+        for _ in range(n_strings):
+            (length,) = STRING_LEN.unpack_from(self._mm, pos)
+            pos += STRING_LEN.size
+            self.strings.append(bytes(self._view[pos:pos + length]).decode("utf-8"))
+            pos += length
+
+    def close(self):
+        if self._mm is not None:
+            self._view.release()
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def players(self, match_no):
+        """Yields raw player records for one match without touching its throws."""
+        offset, _, n_players, _, _, _ = self.index[match_no]
+        start = offset + MATCH_HEADER.size
+        return PLAYER.iter_unpack(self._view[start:start + n_players * PLAYER.size])
+
+    def throws(self, match_no):
+        """Yields raw (slot, turn, value, multiplier, score, flags) tuples straight from the map."""
+        offset, _, n_players, _, _, n_throws = self.index[match_no]
+        start = offset + MATCH_HEADER.size + n_players * PLAYER.size
+        return THROW.iter_unpack(self._view[start:start + n_throws * THROW.size])
+
+    def read_match(self, match_no):
+        """Rebuilds the dict produced by Match.export_session."""
+        offset = self.index[match_no][0]
+        _, best_of, current, starting, _ = MATCH_HEADER.unpack_from(self._mm, offset)
+
+        turns_by_slot = {}
+        for slot, turn_no, value, multiplier, score, flags in self.throws(match_no):
+            turns = turns_by_slot.setdefault(slot, [])
+            while len(turns) <= turn_no:
+                turns.append([])
+            turns[turn_no].append(_decode_dart(value, multiplier, score, flags))
+
+        players = []
+        for slot, rec in enumerate(self.players(match_no)):
+            name_id, game_type, start, score, attempts, hits, _, darts, winner = rec[:9]
+            name = self.strings[name_id]
+            if GAME_TYPES[game_type] == "practice_20":
+                stats = dict(zip(PRACTICE_STATS, rec[9:]))
+                players.append({
+                    "player": name,
+                    "game_type": "practice_20",
+                    "score": score,
+                    "stats": stats,
+                    "stats_percentages": {k: (v / darts) * 100 if darts else 0.0 for k, v in stats.items()},
+                    "total_darts_thrown": darts,
+                    "average": (score / darts) * 3 if darts else 0.0
+                })
+                continue
+
+            turns = turns_by_slot.get(slot, [])
+            highest = max((sum(d["score"] for d in t) for t in turns), default=0)
+            players.append({
+                "player": name,
+                "start_score": start,
+                "turns": turns,
+                "checkout_attempts": attempts,
+                "checkouts_hit": hits,
+                "average": ((start - score) / darts) * 3 if darts else 0.0,
+                "highest_score": highest,
+                "total_darts_thrown": darts,
+                "is_winner": bool(winner)
+            })
+
+        return {
+            "players": players,
+            "current_player_index": current,
+            "best_of": best_of,
+            "starting_player_index": starting
+        }
+
+    def player_totals(self):
+        """Aggregates points, darts and wins per player name using only the player records."""
+        totals = {}
+        for match_no in range(len(self.index)):
+            for rec in self.players(match_no):
+                name_id, game_type, start, score, attempts, hits, _, darts, winner = rec[:9]
+                if GAME_TYPES[game_type] != "x01":
+                    continue
+                t = totals.setdefault(self.strings[name_id], {
+                    "matches": 0, "wins": 0, "points": 0, "darts": 0,
+                    "checkout_attempts": 0, "checkouts_hit": 0
+                })
+                t["matches"] += 1
+                t["wins"] += winner
+                t["points"] += start - score
+                t["darts"] += darts
+                t["checkout_attempts"] += attempts
+                t["checkouts_hit"] += hits
+        for t in totals.values():
+            t["average"] = (t["points"] / t["darts"]) * 3 if t["darts"] else 0.0
+        return totals
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage: python match_archive.py ARCHIVE [darts_match_session.json ...]")
+        return 1
+
+    if len(argv) == 2:
+        with ArchiveReader(argv[1]) as reader:
+            print(f"{len(reader)} matches")
+            for name, t in sorted(reader.player_totals().items()):
+                print(f"{name}: {t['matches']} matches, {t['wins']} wins, avg {t['average']:.2f}")
+        return 0
+
+    sessions = []
+    for path in argv[2:]:
+        with open(path) as f:
+            sessions.append(json.load(f))
+    write_archive(argv[1], sessions)
+    print(f"Archived {len(sessions)} matches to {argv[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,237 @@
+import sys
+import threading
+import time
+import types
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+
+# Latency histogram buckets in seconds (Prometheus' defaults, with a finer low end)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Window for the per-second event rates
+RATE_WINDOW = 60
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_lock = threading.Lock()
+_histograms = {}  # (route, method, phase) -> [bucket counts..., sum, count]
+_events = {}      # name -> EventCounter
+
+# Not walked when sizing matches: shared code, not per-match state
+_SKIP_SIZE = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+
+class EventCounter:
+    """A running total plus a rate over the last RATE_WINDOW seconds (one bucket per second)."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.total = 0
+        self.window = window
+        self.seconds = deque()  # [second, count], oldest first
+
+    def add(self, n=1, now=None):
+        second = int(time.monotonic() if now is None else now)
+        self.total += n
+        if self.seconds and self.seconds[-1][0] == second:
+            self.seconds[-1][1] += n
+        else:
+            self.seconds.append([second, n])
+        self._expire(second)
+
+    def _expire(self, second):
+        while self.seconds and self.seconds[0][0] <= second - self.window:
+            self.seconds.popleft()
+
+    def rate(self, now=None):
+        second = int(time.monotonic() if now is None else now)
+        self._expire(second)
+        return sum(count for _, count in self.seconds) / self.window
+
+
+# Always exported, even before the first one happens
+for _event in ("throws", "undos", "busts"):
+    _events[_event] = EventCounter()
+
+
+def count(event, n=1):
+    """Records game events (throws, undos, busts, ...) for the /metrics rates."""
+    with _lock:
+        counter = _events.get(event)
+        if counter is None:
+            counter = _events[event] = EventCounter()
+        counter.add(n)
+
+
+def observe(route, method, phase, seconds):
+    key = (route, method, phase)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+@contextmanager
+def timed(phase):
+    """
+    Books the time spent in the block to phase for the current request, rather than
+    to the view's own logic (e.g. "db" for history writes, "frame" for scoring uploads).
+    """
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = g.setdefault("_metrics_phases", {})
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by obj and everything it references (arrays counted by buffer)."""
+    seen = set() if seen is None else seen
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP_SIZE):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes if obj.base is None else sys.getsizeof(obj)
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return total
+
+
+def _games_size(games):
+    seen = set()
+    total = sys.getsizeof(games)
+    for game_id, match in list(games.items()):
+        # Sized under the match's lock so a request can't change it mid-walk
+        with match.lock:
+            total += sys.getsizeof(game_id) + deep_size(match, seen)
+    return total
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(games):
+    """The metrics in Prometheus text exposition format."""
+    with _lock:
+        events = {name: (c.total, c.rate()) for name, c in sorted(_events.items())}
+        histograms = {key: list(hist) for key, hist in sorted(_histograms.items())}
+
+    lines = [
+        "# HELP darts_live_matches Matches currently held in memory.",
+        "# TYPE darts_live_matches gauge",
+        f"darts_live_matches {len(games)}",
+        "# HELP darts_games_memory_bytes Approximate memory held by in-memory matches, including camera backgrounds.",
+        "# TYPE darts_games_memory_bytes gauge",
+        f"darts_games_memory_bytes {_games_size(games)}",
+    ]
+    for name, (total, rate) in events.items():
+        lines += [
+            f"# HELP darts_{name}_total {name.capitalize()} since the server started.",
+            f"# TYPE darts_{name}_total counter",
+            f"darts_{name}_total {total}",
+            f"# HELP darts_{name}_per_second {name.capitalize()} per second over the last {RATE_WINDOW} s.",
+            f"# TYPE darts_{name}_per_second gauge",
+            f"darts_{name}_per_second {rate:.4f}",
+        ]
+
+    lines += [
+        "# HELP darts_request_phase_seconds Request latency by route and phase: logic (view code and game rules), "
+        "render (Jinja), db, frame (camera scoring) and other (routing, sessions, compression).",
+        "# TYPE darts_request_phase_seconds histogram",
+    ]
+    for (route, method, phase), hist in histograms.items():
+        labels = f'route="{_label(route)}",method="{method}",phase="{phase}"'
+        for bound, n in zip(BUCKETS, hist):
+            lines.append(f'darts_request_phase_seconds_bucket{{{labels},le="{bound:g}"}} {n}')
+        lines.append(f'darts_request_phase_seconds_bucket{{{labels},le="+Inf"}} {hist[-1]}')
+        lines.append(f"darts_request_phase_seconds_sum{{{labels}}} {hist[-2]:.6f}")
+        lines.append(f"darts_request_phase_seconds_count{{{labels}}} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def _render_started(sender, template, context, **extra):
+    g._metrics_render_start = time.perf_counter()
+
+
+def _render_finished(sender, template, context, **extra):
+    start = g.pop("_metrics_render_start", None)
+    if start is not None:
+        phases = g.setdefault("_metrics_phases", {})
+        phases["render"] = phases.get("render", 0.0) + time.perf_counter() - start
+
+
+class _TimingMiddleware:
+    """Times the whole request, up to the app handing back the response."""
+
+    def __init__(self, wsgi_app, environ_key):
+        self.wsgi_app = wsgi_app
+        self.environ_key = environ_key
+
+    def __call__(self, environ, start_response):
+        environ[self.environ_key] = time.perf_counter()
+        return self.wsgi_app(environ, start_response)
+
+
+def init_app(app, games):
+    """
+    Adds /metrics and the request timing. Each request's time is split into the
+    phases above: the view's own time minus anything booked elsewhere is logic, and
+    the time outside the view is other. Streamed bodies (/stream) are not timed past
+    the view returning. Register this after other after_request hooks (e.g.
+    http_cache) so their work counts as other.
+    """
+    environ_key = "darts.request_start"
+    app.wsgi_app = _TimingMiddleware(app.wsgi_app, environ_key)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+    @app.before_request
+    def start_view_timer():
+        g._metrics_view_start = time.perf_counter()
+
+    @app.after_request
+    def stop_view_timer(response):
+        g._metrics_view_time = time.perf_counter() - g._metrics_view_start
+        return response
+
+    @app.teardown_request
+    def record_timings(exc):
+        view_start = g.get("_metrics_view_start")
+        started = request.environ.get(environ_key)
+        if view_start is None or started is None:
+            return
+        now = time.perf_counter()
+        view = g.get("_metrics_view_time", now - view_start)
+        phases = g.get("_metrics_phases", {})
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        for phase, seconds in phases.items():
+            observe(route, request.method, phase, seconds)
+        observe(route, request.method, "logic", max(0.0, view - sum(phases.values())))
+        observe(route, request.method, "other", max(0.0, (now - started) - view))
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render(games), content_type=CONTENT_TYPE)
@@ -0,0 +1,339 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from debug_camera import detect_darts
+from frame_context import BufferPool, FrameContext
+from rectify import CALIBRATION_POINTS, DART_MIN_AREA, Rectifier
+from scoring_logic import get_score_from_coords
+
+# Detections from different cameras closer than this (normalized board units, about
+# 8.5 mm) are taken to be the same dart
+ASSOCIATION_RADIUS = 0.05
+
+
+def board_information(rectifier, image_point):
+    """
+    Inverse covariance of a detection at image_point in normalized board coordinates,
+    assuming isotropic pixel noise. A camera looking at the board at a steep angle
+    stretches one board direction over few pixels, so it gets little weight along
+    that direction and full weight across it.
+    """
+    x, y = image_point
+    ends = rectifier.to_rectified([(x, y), (x + 1, y), (x, y + 1)]) / rectifier.radius
+    jacobian = np.column_stack([ends[1] - ends[0], ends[2] - ends[0]])
+    return np.linalg.inv(jacobian @ jacobian.T)
+
+
+def fuse(observations, radius=ASSOCIATION_RADIUS):
+    """
+    Fuses per-camera detections into one board position per dart.
+    observations: for each camera, a list of (point, information) in normalized board
+    coordinates. Returns a list of (point, n_cameras). A dart hidden from some cameras
+    still comes out, from the cameras that saw it.
+    """
+    clusters = []  # [information sum, weighted point sum, point, cameras]
+    for camera, detections in enumerate(observations):
+        for point, information in detections:
+            point = np.asarray(point, dtype=np.float64)
+            best, best_dist = None, radius
+            for cluster in clusters:
+                if camera in cluster[3]:
+                    continue
+                dist = np.hypot(*(cluster[2] - point))
+                if dist < best_dist:
+                    best, best_dist = cluster, dist
+            if best is None:
+                clusters.append([information.copy(), information @ point, point, {camera}])
+            else:
+                best[0] += information
+                best[1] += information @ point
+                best[2] = np.linalg.solve(best[0], best[1])
+                best[3].add(camera)
+    return [(cluster[2], len(cluster[3])) for cluster in clusters]
+
+
+def synchronise(histories, max_skew):
+    """
+    Picks one result per camera for the same moment: the newest frame of the camera
+    that is furthest behind, and each other camera's frame closest to it in time.
+    histories: per camera, (timestamp, detections) tuples. Returns (timestamp,
+    [detections per camera]), or None if some camera has no frame within max_skew.
+    """
+    if not histories or any(not h for h in histories):
+        return None
+    reference = min(h[-1][0] for h in histories)
+    chosen = []
+    for history in histories:
+        timestamp, detections = min(history, key=lambda r: abs(r[0] - reference))
+        if abs(timestamp - reference) > max_skew:
+            return None
+        chosen.append(detections)
+    return reference, chosen
+
+
+class CameraWorker(threading.Thread):
+    """
+    Captures and runs detection for one camera on its own thread (OpenCV releases the
+    GIL, so cameras are processed in parallel). Each frame is stamped when it is
+    grabbed, and its detections are kept in a short history for synchronising.
+    """
+
+    def __init__(self, source, width, height, history=8):
+        super().__init__(daemon=True)
+        self.source = source
+        self.width = width
+        self.height = height
+        self.lock = threading.Lock()
+        self.history = deque(maxlen=history)
+        self.display = None
+        self.points = []
+        self.rectifier = None
+        self.background = None
+        self.capture_background = False
+        self.fps = 0.0
+        self.stopped = threading.Event()
+        self.error = None
+
+    def open(self):
+        if not isinstance(self.source, (int, str)):
+            return self.source  # already a capture object
+        cap = cv2.VideoCapture(self.source)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return cap
+
+    def set_points(self, points):
+        """Replaces the calibration points. Raises ValueError (keeping the old ones) if they are degenerate."""
+        points = list(points)
+        rectifier = Rectifier(points) if len(points) >= 4 else None
+        self.points = points
+        self.rectifier = rectifier
+
+    def run(self):
+        cap = self.open()
+        if not cap.isOpened():
+            self.error = f"Could not open camera {self.source}"
+            self.stopped.set()
+            return
+
+        pool = BufferPool()
+        frame = None
+        frames = 0
+        fps_start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                # Stamp at grab time: decoding in retrieve() takes a variable while
+                if not cap.grab():
+                    break
+                timestamp = time.monotonic()
+                ok, frame = cap.retrieve(frame)
+                if not ok:
+                    break
+
+                ctx = FrameContext(frame, pool)
+                if self.capture_background:
+                    self.background = FrameContext.from_gray(ctx.gray.copy())
+                    self.capture_background = False
+
+                rectifier, background = self.rectifier, self.background
+                detections = []
+                if rectifier is not None and background is not None:
+                    rectified = ctx.rectified(rectifier)
+                    for _, (u, v) in detect_darts(rectified, background.rectified(rectifier), DART_MIN_AREA):
+                        point = ((u - rectifier.center) / rectifier.radius, (v - rectifier.center) / rectifier.radius)
+                        (x, y), = rectifier.to_image([(u, v)])
+                        detections.append((point, board_information(rectifier, (x, y)), (int(x), int(y))))
+
+                with self.lock:
+                    if self.display is None or self.display.shape != frame.shape:
+                        self.display = np.empty_like(frame)
+                    np.copyto(self.display, frame)
+                    self.history.append((timestamp, detections))
+
+                frames += 1
+                now = time.perf_counter()
+                if now - fps_start >= 1.0:
+                    self.fps = frames / (now - fps_start)
+                    frames = 0
+                    fps_start = now
+        finally:
+            cap.release()
+            self.stopped.set()
+
+    def snapshot(self):
+        """(display frame copy, history list) for the main thread."""
+        with self.lock:
+            display = None if self.display is None else self.display.copy()
+            return display, list(self.history)
+
+
+class MultiCamera:
+    """Runs one CameraWorker per camera and fuses their synchronised detections."""
+
+    def __init__(self, sources, width=1280, height=720, max_skew=0.025):
+        self.workers = [CameraWorker(source, width, height) for source in sources]
+        self.max_skew = max_skew
+        self.last_timestamp = None
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stopped.set()
+        for worker in self.workers:
+            worker.join(timeout=2)
+
+    def calibrated(self):
+        return all(worker.rectifier is not None for worker in self.workers)
+
+    def poll(self, histories=None):
+        """
+        Returns (timestamp, [(score, point, n_cameras)]) for a newly synchronised set of
+        frames, or None if no camera set has completed since the last call.
+        """
+        if histories is None:
+            histories = [worker.snapshot()[1] for worker in self.workers]
+        histories = [[(t, [(p, info) for p, info, _ in d]) for t, d in h] for h in histories]
+        synced = synchronise(histories, self.max_skew)
+        if synced is None:
+            return None
+        timestamp, observations = synced
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return None
+        self.last_timestamp = timestamp
+        darts = []
+        for point, n_cameras in fuse(observations):
+            score = get_score_from_coords(point[0], point[1], 0.0, 0.0, 1.0)
+            darts.append((score, point, n_cameras))
+        return timestamp, darts
+
+    def load_calibration(self, path):
+        with open(path) as f:
+            cameras = json.load(f)["cameras"]
+        for worker in self.workers:
+            points = cameras.get(str(worker.source))
+            if points:
+                worker.set_points([tuple(p) for p in points])
+
+    def save_calibration(self, path):
+        with open(path, "w") as f:
+            json.dump({"cameras": {str(w.source): w.points for w in self.workers}}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score darts from two or three calibrated cameras at once")
+    parser.add_argument("--camera", action="append", required=True,
+                        help="Camera index or video file; repeat for each camera")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--calibration", default="multi_camera.json",
+                        help="Homography points per camera (loaded if present, written with 'w')")
+    parser.add_argument("--max-skew-ms", type=float, default=25.0,
+                        help="Largest capture time difference between cameras in one fused result")
+    args = parser.parse_args()
+
+    sources = [int(c) if c.isdigit() else c for c in args.camera]
+    rig = MultiCamera(sources, args.width, args.height, args.max_skew_ms / 1000)
+    if os.path.exists(args.calibration):
+        rig.load_calibration(args.calibration)
+    rig.start()
+
+    collecting = set()
+
+    def make_callback(worker):
+        def callback(event, x, y, flags, param):
+            if event == cv2.EVENT_LBUTTONDOWN and worker in collecting:
+                try:
+                    worker.set_points(worker.points + [(x, y)])
+                except ValueError as e:
+                    print(f"Camera {worker.source}: {e}")
+                if len(worker.points) == len(CALIBRATION_POINTS):
+                    collecting.discard(worker)
+        return callback
+
+    for worker in rig.workers:
+        cv2.namedWindow(f"Camera {worker.source}")
+        cv2.setMouseCallback(f"Camera {worker.source}", make_callback(worker))
+
+    print("Keys: 'h' calibrate every camera (click " + ", ".join(f"{l}|{r}" for l, r in CALIBRATION_POINTS)
+          + " on the outer double edge; 'h' again to finish), 'b' capture background, 'c' clear background,"
+          " 'w' write calibration, 'q' quit")
+
+    darts = []
+    try:
+        while not all(w.stopped.is_set() for w in rig.workers):
+            result = rig.poll()
+            if result is not None:
+                _, fused = result
+                scores = [score for score, _, _ in fused]
+                if scores != [score for score, _, _ in darts]:
+                    print("Darts: " + (", ".join(f"{s} ({n} cam)" for s, _, n in fused) or "none"))
+                darts = fused
+
+            for worker in rig.workers:
+                display, history = worker.snapshot()
+                if display is None:
+                    continue
+                for px, py in worker.points:
+                    cv2.drawMarker(display, (int(px), int(py)), (255, 0, 255), cv2.MARKER_TILTED_CROSS, 14, 2)
+                if worker.rectifier is not None:
+                    cv2.polylines(display, [worker.rectifier.ring_polyline(1.0)], True, (0, 255, 0), 2)
+                    # Fused darts, projected into this camera
+                    for score, (bx, by), n in darts:
+                        r = worker.rectifier
+                        (x, y), = r.to_image([(r.center + bx * r.radius, r.center + by * r.radius)])
+                        cv2.circle(display, (int(x), int(y)), 5, (0, 0, 255), -1)
+                        cv2.putText(display, f"{score} ({n})", (int(x) + 8, int(y) - 8),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+                if history:
+                    for _, _, (x, y) in history[-1][1]:
+                        cv2.circle(display, (x, y), 4, (0, 255, 0), 1)
+                status = "CALIBRATING" if worker in collecting else f"{worker.fps:.0f} fps"
+                if worker.background is not None:
+                    status += " | BG"
+                cv2.putText(display, f"Camera {worker.source}: {status}", (20, 40),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                if worker in collecting:
+                    left, right = CALIBRATION_POINTS[len(worker.points)]
+                    cv2.putText(display, f"Click outer double edge on the {left}|{right} wire", (20, 75),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                cv2.imshow(f"Camera {worker.source}", display)
+
+            key = cv2.waitKey(5) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == ord('h'):
+                if collecting:
+                    collecting = {w for w in collecting if w.rectifier is None}
+                else:
+                    collecting = set(rig.workers)
+                    for worker in rig.workers:
+                        worker.set_points([])
+            elif key == ord('b'):
+                for worker in rig.workers:
+                    worker.capture_background = True
+            elif key == ord('c'):
+                for worker in rig.workers:
+                    worker.background = None
+            elif key == ord('w'):
+                rig.save_calibration(args.calibration)
+                print(f"Calibration written to {args.calibration}")
+    finally:
+        rig.stop()
+        cv2.destroyAllWindows()
+        for worker in rig.workers:
+            if worker.error:
+                print(worker.error)
+
+
+if __name__ == "__main__":
+    main()
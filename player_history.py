@@ -0,0 +1,294 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB = os.environ.get("DARTS_HISTORY_DB", "darts_history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS legs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    played_at TEXT NOT NULL,
+    start_score INTEGER NOT NULL,
+    darts INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    first9_points INTEGER NOT NULL,
+    first9_darts INTEGER NOT NULL,
+    checkout_attempts INTEGER NOT NULL,
+    checkouts_hit INTEGER NOT NULL,
+    one80s INTEGER NOT NULL,
+    highest_visit INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    leg_key TEXT
+);
+CREATE INDEX IF NOT EXISTS legs_player_date ON legs (player, played_at);
+CREATE INDEX IF NOT EXISTS legs_date ON legs (played_at);
+
+CREATE TABLE IF NOT EXISTS player_stats (
+    player TEXT PRIMARY KEY,
+    legs INTEGER NOT NULL,
+    legs_won INTEGER NOT NULL,
+    darts INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    first9_points INTEGER NOT NULL,
+    first9_darts INTEGER NOT NULL,
+    checkout_attempts INTEGER NOT NULL,
+    checkouts_hit INTEGER NOT NULL,
+    one80s INTEGER NOT NULL,
+    highest_visit INTEGER NOT NULL,
+    best_leg INTEGER,
+    average REAL NOT NULL,
+    first9_average REAL NOT NULL,
+    checkout_percentage REAL NOT NULL,
+    last_played TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS player_stats_average ON player_stats (average);
+CREATE INDEX IF NOT EXISTS player_stats_first9 ON player_stats (first9_average);
+CREATE INDEX IF NOT EXISTS player_stats_checkout ON player_stats (checkout_percentage);
+CREATE INDEX IF NOT EXISTS player_stats_one80s ON player_stats (one80s);
+CREATE INDEX IF NOT EXISTS player_stats_best_leg ON player_stats (best_leg);
+"""
+
+# Rollup is folded into the existing row so each finished leg is one upsert.
+UPSERT_ROLLUP = """
+INSERT INTO player_stats (
+    player, legs, legs_won, darts, points, first9_points, first9_darts,
+    checkout_attempts, checkouts_hit, one80s, highest_visit, best_leg,
+    average, first9_average, checkout_percentage, last_played
+) VALUES (
+    :player, 1, :won, :darts, :points, :first9_points, :first9_darts,
+    :checkout_attempts, :checkouts_hit, :one80s, :highest_visit,
+    CASE WHEN :won THEN :darts END,
+    CASE WHEN :darts THEN :points * 3.0 / :darts ELSE 0 END,
+    CASE WHEN :first9_darts THEN :first9_points * 3.0 / :first9_darts ELSE 0 END,
+    CASE WHEN :checkout_attempts THEN :checkouts_hit * 100.0 / :checkout_attempts ELSE 0 END,
+    :played_at
+)
+ON CONFLICT (player) DO UPDATE SET
+    legs = legs + 1,
+    legs_won = legs_won + excluded.legs_won,
+    darts = darts + excluded.darts,
+    points = points + excluded.points,
+    first9_points = first9_points + excluded.first9_points,
+    first9_darts = first9_darts + excluded.first9_darts,
+    checkout_attempts = checkout_attempts + excluded.checkout_attempts,
+    checkouts_hit = checkouts_hit + excluded.checkouts_hit,
+    one80s = one80s + excluded.one80s,
+    highest_visit = MAX(highest_visit, excluded.highest_visit),
+    best_leg = CASE
+        WHEN excluded.best_leg IS NULL THEN best_leg
+        WHEN best_leg IS NULL THEN excluded.best_leg
+        ELSE MIN(best_leg, excluded.best_leg) END,
+    average = CASE WHEN darts + excluded.darts
+        THEN (points + excluded.points) * 3.0 / (darts + excluded.darts) ELSE 0 END,
+    first9_average = CASE WHEN first9_darts + excluded.first9_darts
+        THEN (first9_points + excluded.first9_points) * 3.0 / (first9_darts + excluded.first9_darts) ELSE 0 END,
+    checkout_percentage = CASE WHEN checkout_attempts + excluded.checkout_attempts
+        THEN (checkouts_hit + excluded.checkouts_hit) * 100.0 / (checkout_attempts + excluded.checkout_attempts) ELSE 0 END,
+    last_played = MAX(last_played, excluded.last_played)
+"""
+
+# leg_key names where a leg came from (see record_legs), so recording the same leg
+# again is a no-op instead of counting it twice
+LEG_KEY_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS legs_key ON legs (leg_key)"
+
+INSERT_LEG = """
+INSERT OR IGNORE INTO legs (
+    player, played_at, start_score, darts, points, first9_points, first9_darts,
+    checkout_attempts, checkouts_hit, one80s, highest_visit, won, leg_key
+) VALUES (
+    :player, :played_at, :start_score, :darts, :points, :first9_points, :first9_darts,
+    :checkout_attempts, :checkouts_hit, :one80s, :highest_visit, :won, :leg_key
+)
+"""
+
+LEADERBOARD_COLUMNS = {
+    "average": "average DESC",
+    "first9_average": "first9_average DESC",
+    "checkout_percentage": "checkout_percentage DESC",
+    "one80s": "one80s DESC",
+    "best_leg": "best_leg ASC",
+}
+
+
+def leg_stats(name, start_score, turns, checkout_attempts, checkouts_hit, won):
+    """Summarises one X01 leg from its list of turns (as stored by DartsGame)."""
+    darts = 0
+    points = 0
+    first9_points = 0
+    first9_darts = 0
+    one80s = 0
+    highest = 0
+
+    for turn_no, turn in enumerate(turns):
+        busted = bool(turn) and turn[0].get("input") == "BUST"
+        turn_score = 0 if busted else sum(d["score"] for d in turn)
+        darts += len(turn)
+        points += turn_score
+        if turn_no < 3:
+            first9_points += turn_score
+            first9_darts += len(turn)
+        if turn_score == 180:
+            one80s += 1
+        highest = max(highest, turn_score)
+
+    return {
+        "player": name,
+        "start_score": start_score,
+        "darts": darts,
+        "points": points,
+        "first9_points": first9_points,
+        "first9_darts": first9_darts,
+        "checkout_attempts": checkout_attempts,
+        "checkouts_hit": checkouts_hit,
+        "one80s": one80s,
+        "highest_visit": highest,
+        "won": int(won),
+    }
+
+
+def match_leg_stats(match):
+    """leg_stats for every X01 player in a Match, for the leg that just finished."""
+    legs = []
+    for p in match.players:
+        if p.game_type != "x01":
+            continue
+        turns = list(p.turns)
+        if p.current_turn:
+            turns.append(p.current_turn)
+        legs.append(leg_stats(p.name, p.start_score, turns,
+                              p.checkout_attempts, p.checkouts_hit, p.score == 0))
+    return legs
+
+
+class PlayerHistory:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Databases from before leg_key get the column added
+            if "leg_key" not in {row["name"] for row in conn.execute("PRAGMA table_info(legs)")}:
+                conn.execute("ALTER TABLE legs ADD COLUMN leg_key TEXT")
+            conn.execute(LEG_KEY_INDEX)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record_legs(self, legs, played_at=None, source=None):
+        """
+        Stores finished legs and folds them into the per-player rollups in one
+        transaction. With a source (e.g. an export's hash) each leg is keyed by it
+        and its position, and legs already recorded under that key are skipped.
+        Returns the number of legs stored.
+        """
+        played_at = played_at or datetime.datetime.now().isoformat(timespec="seconds")
+        rows = [dict(leg, played_at=played_at, leg_key=f"{source}:{i}" if source else None)
+                for i, leg in enumerate(legs)]
+        stored = 0
+        if not rows:
+            return stored
+        conn = self._connect()
+        try:
+            with conn:
+                for row in rows:
+                    if conn.execute(INSERT_LEG, row).rowcount:
+                        conn.execute(UPSERT_ROLLUP, row)
+                        stored += 1
+        finally:
+            conn.close()
+        return stored
+
+    def record_match_leg(self, match, played_at=None):
+        """Records the leg that just finished for every X01 player in a Match."""
+        self.record_legs(match_leg_stats(match), played_at)
+
+    def import_session(self, data, played_at=None):
+        """
+        Imports the last leg of each X01 player from a Match.export_session dict.
+        Keyed like the live recording (match id and leg number) when the export has
+        a match id, else by the export's content, so importing a leg again adds
+        nothing. Returns the number of legs stored.
+        """
+        players = data.get("players", [])
+        legs = [
+            leg_stats(p["player"], p["start_score"], p["turns"],
+                      p.get("checkout_attempts", 0), p.get("checkouts_hit", 0), p.get("is_winner", False))
+            for p in players
+            if p.get("game_type", "x01") == "x01"
+        ]
+        if data.get("match_id"):
+            # An unfinished leg is numbered as the one being played
+            leg_no = sum(p.get("legs_won", 0) for p in players)
+            if not any(p.get("is_winner") for p in players):
+                leg_no += 1
+            source = f"match:{data['match_id']}:{leg_no}"
+        else:
+            source = "export:" + hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        return self.record_legs(legs, played_at, source=source)
+
+    def import_files(self, paths):
+        """Bulk-imports darts_match_session.json exports, dated by file modification time."""
+        count = 0
+        for path in paths:
+            with open(path) as f:
+                data = json.load(f)
+            mtime = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+            count += self.import_session(data, played_at=mtime.isoformat(timespec="seconds"))
+        return count
+
+    def player_stats(self, name):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM player_stats WHERE player = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def leaderboard(self, stat="average", limit=10, min_legs=1):
+        if stat not in LEADERBOARD_COLUMNS:
+            raise ValueError(f"Unknown leaderboard stat: {stat}")
+        where = "legs >= ?"
+        if stat == "best_leg":
+            where += " AND best_leg IS NOT NULL"
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM player_stats WHERE {where} ORDER BY {LEADERBOARD_COLUMNS[stat]} LIMIT ?",
+                (min_legs, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(r) for r in rows]
+
+    def recent_legs(self, name, since=None, limit=50):
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM legs WHERE player = ? AND played_at >= ? ORDER BY played_at DESC LIMIT ?",
+                (name, since or "", limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(r) for r in rows]
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage: python player_history.py darts_match_session.json [...]")
+        return 1
+    history = PlayerHistory()
+    count = history.import_files(argv[1:])
+    print(f"Imported {count} legs into {history.path}")
+    for row in history.leaderboard():
+        print(f"{row['player']}: {row['legs']} legs, avg {row['average']:.2f}, "
+              f"first 9 {row['first9_average']:.2f}, checkout {row['checkout_percentage']:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,111 @@
+import math
+
+import cv2
+import numpy as np
+
+from scoring_logic import SEGMENTS, get_score_from_coords, get_scores_from_coords
+
+# Rectified board image: face-on, 20 at the top, outer double edge at RECTIFIED_RADIUS px
+RECTIFIED_SIZE = 400
+RECTIFIED_RADIUS = 160
+
+# detect_darts' min_area for rectified frames; the board is smaller than in a 720p frame
+DART_MIN_AREA = 15
+
+# Outer double ring radius in mm, for reporting the fit error
+BOARD_RADIUS_MM = 170.0
+
+# Calibration points in click order: where the wire between two segments meets the
+# outer edge of the double ring. The first four are a quarter turn apart, which is
+# enough to fit the homography; the other four refine it.
+CALIBRATION_POINTS = [(20, 1), (6, 10), (3, 19), (11, 14), (4, 13), (2, 17), (16, 8), (12, 5)]
+
+
+def boundary_angle(left, right):
+    """Clockwise angle from the top, in degrees, of the wire between two neighbouring segments."""
+    i = SEGMENTS.index(left)
+    if SEGMENTS[(i + 1) % len(SEGMENTS)] != right:
+        raise ValueError(f"{left} and {right} are not neighbouring segments")
+    return 9 + 18 * i
+
+
+def calibration_board_points(n):
+    """Normalized board coordinates (x right, y down, outer double at 1.0) of the first n calibration points."""
+    points = []
+    for left, right in CALIBRATION_POINTS[:n]:
+        angle = math.radians(boundary_angle(left, right))
+        points.append((math.sin(angle), -math.cos(angle)))
+    return np.array(points, dtype=np.float64)
+
+
+class Rectifier:
+    """
+    Full perspective calibration: a homography from camera pixels to a face-on board
+    image, fitted to four or more clicked calibration points. The remap tables are
+    built once here, so rectifying a frame is a single table lookup per pixel.
+    """
+
+    def __init__(self, image_points, size=RECTIFIED_SIZE, radius=RECTIFIED_RADIUS):
+        image_points = np.asarray(image_points, dtype=np.float64).reshape(-1, 2)
+        if len(image_points) < 4:
+            raise ValueError("At least four calibration points are needed")
+        if len(image_points) > len(CALIBRATION_POINTS):
+            raise ValueError(f"At most {len(CALIBRATION_POINTS)} calibration points are supported")
+
+        self.size = size
+        self.radius = radius
+        self.center = size / 2
+        self.image_points = image_points
+        targets = calibration_board_points(len(image_points)) * radius + self.center
+
+        matrix, _ = cv2.findHomography(image_points, targets, 0)
+        if matrix is None:
+            raise ValueError("Calibration points are degenerate (three or more in a line?)")
+        self.matrix = matrix
+        self.inverse = np.linalg.inv(matrix)
+
+        # Mean distance between where the clicked points land and where they should be
+        residual = self.to_rectified(image_points) - targets
+        self.error_mm = float(np.hypot(residual[:, 0], residual[:, 1]).mean()) * BOARD_RADIUS_MM / radius
+
+        # For every rectified pixel, the camera pixel to sample
+        us, vs = np.meshgrid(np.arange(size, dtype=np.float64), np.arange(size, dtype=np.float64))
+        sources = self.to_image(np.stack([us.ravel(), vs.ravel()], axis=1)).reshape(size, size, 2)
+        self.map1, self.map2 = cv2.convertMaps(sources[..., 0].astype(np.float32),
+                                               sources[..., 1].astype(np.float32), cv2.CV_16SC2)
+
+    def rectify(self, image, dst=None):
+        """Warps a camera frame (BGR or gray) to the face-on board image."""
+        return cv2.remap(image, self.map1, self.map2, cv2.INTER_LINEAR, dst=dst,
+                         borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    def to_rectified(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.matrix).reshape(-1, 2)
+
+    def to_image(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.inverse).reshape(-1, 2)
+
+    def score(self, x, y, **ring_scales):
+        """Scores a point in rectified pixels. ring_scales are get_score_from_coords' ring arguments."""
+        return get_score_from_coords(x, y, self.center, self.center, self.radius, **ring_scales)
+
+    def score_image_point(self, x, y, **ring_scales):
+        """Scores a point in camera pixels."""
+        (u, v), = self.to_rectified([(x, y)])
+        return self.score(u, v, **ring_scales)
+
+    def score_image_grid(self, height, width, **ring_scales):
+        """Score code of every camera pixel in a height x width frame (for overlays)."""
+        ys, xs = np.mgrid[0:height, 0:width]
+        uv = self.to_rectified(np.stack([xs.ravel(), ys.ravel()], axis=1))
+        return get_scores_from_coords(
+            (uv[:, 0] - self.center) / self.radius, (uv[:, 1] - self.center) / self.radius, **ring_scales
+        ).reshape(height, width)
+
+    def ring_polyline(self, scale, steps=120):
+        """A ring of normalized radius scale, projected into the camera frame as int32 points for cv2.polylines."""
+        t = np.linspace(0, 2 * math.pi, steps, endpoint=False)
+        ring = np.stack([np.cos(t), np.sin(t)], axis=1) * scale * self.radius + self.center
+        return np.round(self.to_image(ring)).astype(np.int32)
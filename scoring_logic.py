@@ -1,9 +1,20 @@
 import math
 import random
+import numpy as np
 
 # Standard Dartboard Segments starting from Top (12 o'clock) and moving clockwise
 SEGMENTS = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
 
+# Segment value -> clockwise index from the top, for vectorized lookups
+_SEGMENT_INDEX = np.full(21, -1, dtype=np.int64)
+_SEGMENT_INDEX[SEGMENTS] = np.arange(len(SEGMENTS))
+
+# Score codes used by the batch generator: multiplier * 100 + value.
+# 0 is a miss, 125 the outer bull (25) and 225 the bullseye (50).
+CODE_MISS = 0
+CODE_BULL = 125
+CODE_BULLSEYE = 225
+
 def get_score_from_coords(x, y, center_x, center_y, board_radius, vertical_scale=1.0, treble_scale=0.61, double_scale=0.953, outer_double_scale=1.0, inner_bull_scale=0.0374, bull_scale=0.0935, calibration_angle=0.0, ellipse_angle=0.0):
     """
     Calculates the dart score based on pixel coordinates.
@@ -124,4 +135,110 @@ def get_coords_from_score(score_str):
     else:
         r = random.uniform(0.15, 0.55) if random.random() < 0.5 else random.uniform(0.66, 0.93)
             
-    return r * math.cos(rad), r * math.sin(rad)
\ No newline at end of file
+    return r * math.cos(rad), r * math.sin(rad)
+
+def score_to_code(score_str):
+    """Converts a score string ("T20", "D16", "25", "MISS", ...) to a batch score code. Invalid input maps to a miss."""
+    s = str(score_str).upper().strip()
+    if s == "50":
+        return CODE_BULLSEYE
+    if s == "25":
+        return CODE_BULL
+
+    multiplier = 1
+    if s.startswith("D"):
+        multiplier = 2
+        s = s[1:]
+    elif s.startswith("T"):
+        multiplier = 3
+        s = s[1:]
+
+    if not s.isdigit() or int(s) not in SEGMENTS:
+        return CODE_MISS
+    return multiplier * 100 + int(s)
+
+
+def get_coords_from_scores(scores, seed=None):
+    """
+    Batch version of get_coords_from_score.
+
+    Args:
+        scores: Sequence of score strings, or an integer array of score codes (see score_to_code).
+        seed: Seed or numpy.random.Generator. The same seed always gives the same coordinates.
+
+    Returns:
+        (N, 2) float array of normalized (x, y) coordinates. Misses are NaN.
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+    codes = np.asarray(scores)
+    if codes.dtype.kind in "USO":
+        codes = np.array([score_to_code(s) for s in codes.ravel()], dtype=np.int64)
+    codes = codes.astype(np.int64, copy=False).ravel()
+    n = codes.shape[0]
+
+    multiplier = codes // 100
+    value = codes % 100
+    is_bullseye = codes == CODE_BULLSEYE
+    is_bull = codes == CODE_BULL
+    is_segment = (value >= 1) & (value <= 20) & (multiplier >= 1) & (multiplier <= 3)
+    is_segment &= _SEGMENT_INDEX[np.clip(value, 0, 20)] >= 0
+
+    # Draw every variate up front so results don't depend on the mix of scores
+    u_angle = rng.random(n)
+    u_radius = rng.random(n)
+    u_band = rng.random(n)
+    u_band_radius = rng.random(n)
+
+    seg_idx = _SEGMENT_INDEX[np.clip(value, 0, 20)]
+    angle = np.radians(seg_idx * 18 - 90 + (u_angle * 16 - 8))
+    single_r = np.where(u_band < 0.5, 0.15 + u_band_radius * 0.40, 0.66 + u_band_radius * 0.27)
+    r = np.select(
+        [multiplier == 3, multiplier == 2],
+        [0.59 + u_radius * 0.04, 0.96 + u_radius * 0.03],
+        single_r
+    )
+
+    bull_angle = u_angle * 2 * math.pi
+    bull_r = 0.04 + u_radius * 0.05
+    angle = np.where(is_bull, bull_angle, angle)
+    r = np.where(is_bull, bull_r, r)
+    r = np.where(is_bullseye, 0.0, r)
+
+    coords = np.empty((n, 2), dtype=np.float64)
+    coords[:, 0] = r * np.cos(angle)
+    coords[:, 1] = r * np.sin(angle)
+    coords[~(is_segment | is_bull | is_bullseye)] = np.nan
+    return coords
+
+
+def get_scores_from_coords(x, y, vertical_scale=1.0, treble_scale=0.61, double_scale=0.953, outer_double_scale=1.0, inner_bull_scale=0.0374, bull_scale=0.0935, calibration_angle=0.0, ellipse_angle=0.0):
+    """
+    Batch version of get_score_from_coords for normalized coordinates
+    (board centre at 0, 0 and outer double edge at radius 1).
+
+    Returns an integer array of score codes (see score_to_code), with the same
+    ring and segment boundaries as the scalar function.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    rad_ellipse = math.radians(-ellipse_angle)
+    rx = x * math.cos(rad_ellipse) - y * math.sin(rad_ellipse)
+    ry = (x * math.sin(rad_ellipse) + y * math.cos(rad_ellipse)) / vertical_scale
+    norm_dist = np.hypot(rx, ry)
+
+    corrected_angle = (np.degrees(np.arctan2(ry, rx)) + 90 - calibration_angle) % 360
+    segment_index = (((corrected_angle + 9) % 360) // 18).astype(np.int64) % 20
+    value = np.asarray(SEGMENTS, dtype=np.int64)[segment_index]
+
+    treble_half_width = 0.03
+    multiplier = np.where(
+        (norm_dist >= treble_scale - treble_half_width) & (norm_dist <= treble_scale + treble_half_width), 3,
+        np.where((norm_dist >= double_scale) & (norm_dist <= outer_double_scale), 2, 1)
+    )
+    codes = multiplier * 100 + value
+    codes = np.where(norm_dist > outer_double_scale, CODE_MISS, codes)
+    codes = np.where(norm_dist <= bull_scale, CODE_BULL, codes)
+    codes = np.where(norm_dist <= inner_bull_scale, CODE_BULLSEYE, codes)
+    return codes
@@ -0,0 +1,19 @@
+from gevent import monkey
+monkey.patch_all()
+
+import os
+
+from gevent.pywsgi import WSGIServer
+
+from app import app, start_snapshots
+
+# Async serving mode: one process, one greenlet per connection. Long-lived
+# /stream viewers and frame uploads only park their own greenlet, and frame
+# decoding/scoring runs on the hub's native threadpool (see frame_scoring.offload).
+# The same app also runs under gunicorn with `-k gevent`.
+
+if __name__ == "__main__":
+    start_snapshots()
+    port = int(os.environ.get("PORT", 10000))
+    print(f"Serving on http://0.0.0.0:{port} (gevent)")
+    WSGIServer(("0.0.0.0", port), app).serve_forever()
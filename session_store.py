@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Live matches are written to a snapshot file so a restarted server picks them up
+# again. The file is only rewritten when some match changed since the last write,
+# and is replaced atomically, so a crash mid-write leaves the previous snapshot.
+
+SNAPSHOT_VERSION = 1
+
+
+def read_snapshot(path):
+    """Returns {game_id: match state} from a snapshot file, or {} if there is none."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return {}
+    if data.get("version") != SNAPSHOT_VERSION:
+        print(f"Ignoring snapshot {path}: version {data.get('version')}, expected {SNAPSHOT_VERSION}")
+        return {}
+    return data["matches"]
+
+
+def write_snapshot(path, encoded):
+    """Writes {game_id: JSON-encoded match state} to path, replacing it atomically."""
+    # A temp file of our own next to path, so the rename stays on one filesystem
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write('{"version": %d, "saved_at": %s, "matches": {' % (SNAPSHOT_VERSION, json.dumps(time.time())))
+            f.write(", ".join(f"{json.dumps(game_id)}: {state}" for game_id, state in encoded.items()))
+            f.write("}}")
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Snapshotter(threading.Thread):
+    """
+    Writes the live matches in games to path every interval seconds while any of
+    them has changed. Each match is encoded under its own lock, so a snapshot never
+    holds a half-applied throw; unchanged matches reuse their previous encoding.
+    """
+
+    def __init__(self, games, path, interval=0.5):
+        super().__init__(daemon=True)
+        self.games = games
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self._encoded = {}  # game_id -> (token, version, JSON)
+        self.writes = 0
+
+    def save(self, force=False):
+        """Writes a snapshot if anything changed (or force). Returns True if it wrote one."""
+        changed = force or self._encoded.keys() != self.games.keys()
+        encoded = {}
+        for game_id, match in list(self.games.items()):
+            cached = self._encoded.get(game_id)
+            if cached is None or cached[0] != match.token or cached[1] != match.version:
+                with match.lock:
+                    cached = (match.token, match.version, json.dumps(match.export_state()))
+                changed = True
+            encoded[game_id] = cached
+        if not changed:
+            return False
+        write_snapshot(self.path, {game_id: cached[2] for game_id, cached in encoded.items()})
+        self._encoded = encoded
+        self.writes += 1
+        return True
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Could not write snapshot {self.path}: {e}")
+
+    def stop(self):
+        """Stops the thread and writes a final snapshot."""
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout=2)
+        self.save()
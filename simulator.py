@@ -0,0 +1,188 @@
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from checkouts import CHECKOUTS
+from scoring_logic import SEGMENTS, CODE_BULL, CODE_BULLSEYE, get_scores_from_coords, score_to_code
+
+# Normalized radius a player aims at for each ring (middle of the ring)
+AIM_RADIUS = {1: 0.78, 2: 0.9765, 3: 0.61}
+
+# Legs per task. Fixed so a given seed gives the same result whatever the worker count.
+CHUNK_SIZE = 50_000
+# Steps (darts thrown) per leg before it is given up on as unfinished. A bust
+# counts the rest of its visit, so a leg can take up to 3 darts per step.
+MAX_DARTS = 300
+HISTOGRAM_SIZE = 3 * MAX_DARTS + 1
+CODE_TRIPLE_20 = 320
+
+
+def aim_point(code):
+    """Normalized (x, y) point a player aims at for a score code."""
+    if code in (CODE_BULL, CODE_BULLSEYE):
+        return 0.0, 0.0
+    multiplier, value = divmod(code, 100)
+    rad = math.radians(SEGMENTS.index(value) * 18 - 90)
+    r = AIM_RADIUS[multiplier]
+    return r * math.cos(rad), r * math.sin(rad)
+
+
+def build_aim_table(start_score, strategy=None, default="T20"):
+    """
+    Maps every remaining score to an aim code. The strategy is a dict in the shape
+    of CHECKOUTS; the first dart of its route is aimed at, otherwise the default.
+    """
+    strategy = CHECKOUTS if strategy is None else strategy
+    table = np.full(start_score + 1, score_to_code(default), dtype=np.int64)
+    for score in range(2, start_score + 1):
+        route = strategy.get(score)
+        if route:
+            # CHECKOUTS writes the bullseye as D25
+            table[score] = CODE_BULLSEYE if route[0] == "D25" else score_to_code(route[0])
+    return table
+
+
+def simulate_chunk(n_legs, start_score, sigma, aim_table, seed_seq):
+    """
+    Plays n_legs X01 legs in lockstep, one dart per step, using the DartsGame rules:
+    bust below zero or on 1, NO_DOUBLE on a non-double finish, and 3-dart visits where
+    a bust counts all three darts. Legs not won within MAX_DARTS steps are counted
+    as unfinished and left out of the histogram.
+    """
+    rng = np.random.default_rng(seed_seq)
+    sigma_x, sigma_y = (sigma, sigma) if np.isscalar(sigma) else sigma
+
+    aim_xy = np.zeros((CODE_TRIPLE_20 + 1, 2))
+    for code in np.unique(aim_table):
+        aim_xy[code] = aim_point(int(code))
+
+    score = np.full(n_legs, start_score, dtype=np.int64)
+    turn_start = score.copy()
+    dart_in_turn = np.zeros(n_legs, dtype=np.int64)
+    darts = np.zeros(n_legs, dtype=np.int64)
+    attempts = np.zeros(n_legs, dtype=np.int64)
+    done = np.zeros(n_legs, dtype=bool)
+    visits_180 = 0
+    turn_points = np.zeros(n_legs, dtype=np.int64)
+
+    for _ in range(MAX_DARTS):
+        idx = np.flatnonzero(~done)
+        if idx.size == 0:
+            break
+
+        s = score[idx]
+        aim = aim_table[s]
+        hit_x = aim_xy[aim, 0] + rng.normal(0.0, sigma_x, idx.size)
+        hit_y = aim_xy[aim, 1] + rng.normal(0.0, sigma_y, idx.size)
+        codes = get_scores_from_coords(hit_x, hit_y)
+
+        multiplier, value = np.divmod(codes, 100)
+        points = value * multiplier
+        is_double = multiplier == 2
+        new_score = s - points
+
+        bust = (new_score < 0) | (new_score == 1) | ((new_score == 0) & ~is_double)
+        win = (new_score == 0) & is_double
+        ok = ~bust
+
+        in_checkout_range = (s == 50) | ((s <= 40) & (s % 2 == 0) & (s > 0))
+        attempts[idx[ok & in_checkout_range]] += 1
+
+        bust_idx = idx[bust]
+        darts[bust_idx] += 3 - dart_in_turn[bust_idx]
+        score[bust_idx] = turn_start[bust_idx]
+        dart_in_turn[bust_idx] = 0
+        turn_points[bust_idx] = 0
+
+        ok_idx = idx[ok]
+        score[ok_idx] = new_score[ok]
+        darts[ok_idx] += 1
+        dart_in_turn[ok_idx] += 1
+        turn_points[ok_idx] += points[ok]
+        done[idx[win]] = True
+
+        turn_over = ok_idx[(dart_in_turn[ok_idx] == 3) & ~done[ok_idx]]
+        visits_180 += int(np.count_nonzero(turn_points[turn_over] == 180))
+        turn_start[turn_over] = score[turn_over]
+        dart_in_turn[turn_over] = 0
+        turn_points[turn_over] = 0
+
+    finished = darts[done]
+    return {
+        "legs": n_legs,
+        "finished": int(finished.size),
+        "unfinished": n_legs - int(finished.size),
+        "darts_histogram": np.bincount(finished, minlength=HISTOGRAM_SIZE),
+        "darts": int(darts.sum()),
+        "points": int((start_score - score).sum()),
+        "checkout_attempts": int(attempts.sum()),
+        "checkouts_hit": int(done.sum()),
+        "one80s": visits_180,
+    }
+
+
+def simulate(n_legs, start_score=501, sigma=0.1, strategy=None, seed=0, workers=None):
+    """
+    Runs n_legs simulated legs across a process pool and merges the results.
+    Deterministic for a given seed regardless of the number of workers.
+    """
+    aim_table = build_aim_table(start_score, strategy)
+    chunks = [CHUNK_SIZE] * (n_legs // CHUNK_SIZE)
+    if n_legs % CHUNK_SIZE:
+        chunks.append(n_legs % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = workers or os.cpu_count() or 1
+
+    args = [(n, start_score, sigma, aim_table, s) for n, s in zip(chunks, seeds)]
+    if workers == 1 or len(chunks) == 1:
+        results = [simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, *zip(*args)))
+
+    histogram = sum(r["darts_histogram"] for r in results)
+    totals = {k: sum(r[k] for r in results) for k in
+              ("legs", "finished", "unfinished", "darts", "points", "checkout_attempts", "checkouts_hit", "one80s")}
+    return summarize(histogram, totals)
+
+
+def summarize(histogram, totals):
+    finished = totals["finished"]
+    darts_per_leg = np.repeat(np.arange(histogram.shape[0]), histogram)
+    summary = dict(totals)
+    summary["darts_histogram"] = {int(d): int(c) for d, c in enumerate(histogram) if c}
+    summary["mean_darts"] = float(darts_per_leg.mean()) if finished else 0.0
+    summary["darts_percentiles"] = (
+        {p: float(np.percentile(darts_per_leg, p)) for p in (10, 50, 90)} if finished else {}
+    )
+    summary["average"] = (totals["points"] / totals["darts"]) * 3 if totals["darts"] else 0.0
+    summary["checkout_percentage"] = (
+        (totals["checkouts_hit"] / totals["checkout_attempts"]) * 100 if totals["checkout_attempts"] else 0.0
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo X01 leg simulator")
+    parser.add_argument("--legs", type=int, default=100_000)
+    parser.add_argument("--start", type=int, default=501)
+    parser.add_argument("--sigma", type=float, default=0.1, help="Dart dispersion as a fraction of board radius")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    result = simulate(args.legs, args.start, args.sigma, seed=args.seed, workers=args.workers)
+    print(f"Legs: {result['legs']} ({result['finished']} finished, "
+          f"{result['unfinished']} unfinished after {MAX_DARTS} darts)")
+    print(f"Darts per leg: mean {result['mean_darts']:.2f}, "
+          + ", ".join(f"p{p} {v:.0f}" for p, v in result["darts_percentiles"].items()))
+    print(f"3-dart average: {result['average']:.2f}")
+    print(f"Checkout: {result['checkouts_hit']}/{result['checkout_attempts']} ({result['checkout_percentage']:.1f}%)")
+    print(f"180s: {result['one80s']}")
+
+
+if __name__ == "__main__":
+    main()
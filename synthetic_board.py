@@ -0,0 +1,237 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+from scoring_logic import SEGMENTS, CODE_BULL, CODE_BULLSEYE, get_coords_from_scores, get_scores_from_coords
+
+# BGR colours of a standard board
+BLACK = (25, 25, 25)
+CREAM = (190, 225, 235)
+RED = (40, 40, 200)
+GREEN = (60, 140, 30)
+SURROUND = (15, 15, 15)
+WALL = (120, 130, 140)
+
+# Radius of the black number ring relative to the outer double edge
+SURROUND_SCALE = 1.3
+
+DART_SCORES = ["T20", "20", "T19", "19", "D16", "D20", "25", "50", "5", "1", "T18", "D3", "12", "9"]
+
+
+def random_params(rng, width=640, height=480):
+    """Draws a random but plausible camera setup for one frame."""
+    radius = rng.uniform(0.3, 0.42) * min(width, height)
+    return {
+        "center": (width / 2 + rng.uniform(-0.08, 0.08) * width, height / 2 + rng.uniform(-0.08, 0.08) * height),
+        "board_radius": radius,
+        "vertical_scale": rng.uniform(0.7, 1.0),
+        "ellipse_angle": rng.uniform(-20, 20),
+        "calibration_angle": rng.uniform(-9, 9),
+        "brightness": rng.uniform(0.6, 1.2),
+        "gradient": rng.uniform(0.0, 0.5),
+        "gradient_angle": rng.uniform(0, 2 * math.pi),
+        "noise": rng.uniform(0.0, 12.0),
+    }
+
+
+def board_to_image(points, params):
+    """Maps normalized board coordinates (20 at the top) to pixel coordinates."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    cal = math.radians(params["calibration_angle"])
+    bx = points[:, 0] * math.cos(cal) - points[:, 1] * math.sin(cal)
+    by = (points[:, 0] * math.sin(cal) + points[:, 1] * math.cos(cal)) * params["vertical_scale"]
+    ell = math.radians(params["ellipse_angle"])
+    x = bx * math.cos(ell) - by * math.sin(ell)
+    y = bx * math.sin(ell) + by * math.cos(ell)
+    cx, cy = params["center"]
+    r = params["board_radius"]
+    return np.stack([cx + x * r, cy + y * r], axis=1)
+
+
+def render_board(params, width=640, height=480):
+    """
+    Renders the board with the same geometry get_score_from_coords uses, so every
+    pixel's true score is known exactly. Returns (image, score code per pixel).
+    """
+    cx, cy = params["center"]
+    r = params["board_radius"]
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float64)
+    dx = (xs - cx) / r
+    dy = (ys - cy) / r
+
+    codes = get_scores_from_coords(
+        dx, dy, vertical_scale=params["vertical_scale"],
+        calibration_angle=params["calibration_angle"], ellipse_angle=params["ellipse_angle"]
+    )
+
+    # Un-squash to find the surround ring
+    rad = math.radians(-params["ellipse_angle"])
+    rx = dx * math.cos(rad) - dy * math.sin(rad)
+    ry = (dx * math.sin(rad) + dy * math.cos(rad)) / params["vertical_scale"]
+    norm_dist = np.hypot(rx, ry)
+
+    multiplier, value = np.divmod(codes, 100)
+    seg_index = np.zeros(101, dtype=np.int64)
+    seg_index[SEGMENTS] = np.arange(len(SEGMENTS))
+    dark = (seg_index[np.clip(value, 0, 100)] % 2) == 0
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = WALL
+    image[norm_dist <= SURROUND_SCALE] = SURROUND
+    single = (multiplier == 1) & (codes != CODE_BULL)
+    image[single & dark] = BLACK
+    image[single & ~dark] = CREAM
+    ring = (multiplier == 2) | (multiplier == 3)
+    ring &= (codes != CODE_BULLSEYE)
+    image[ring & dark] = RED
+    image[ring & ~dark] = GREEN
+    image[codes == CODE_BULL] = GREEN
+    image[codes == CODE_BULLSEYE] = RED
+
+    # Wires around every ring
+    for scale in (0.0374, 0.0935, 0.58, 0.64, 0.953, 1.0):
+        axes = (int(r * scale), int(r * scale * params["vertical_scale"]))
+        cv2.ellipse(image, (int(cx), int(cy)), axes, params["ellipse_angle"], 0, 360, (160, 160, 160), 1, cv2.LINE_AA)
+    return image, codes
+
+
+def apply_lighting(image, params, rng):
+    """Applies brightness, a linear light gradient and sensor noise."""
+    height, width = image.shape[:2]
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    direction = (xs * math.cos(params["gradient_angle"]) + ys * math.sin(params["gradient_angle"])) / max(width, height)
+    light = params["brightness"] * (1.0 - params["gradient"] * direction)
+    out = image.astype(np.float32) * light[..., None]
+    if params["noise"] > 0:
+        out += rng.normal(0, params["noise"], out.shape).astype(np.float32)
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def draw_dart(image, tip, rng):
+    """Draws a dart whose point sits exactly on tip (pixel coordinates)."""
+    angle = rng.uniform(-math.pi * 0.9, -math.pi * 0.1)
+    length = rng.uniform(40, 60)
+    tx, ty = tip
+    barrel = (tx + math.cos(angle) * length * 0.5, ty + math.sin(angle) * length * 0.5)
+    end = (tx + math.cos(angle) * length, ty + math.sin(angle) * length)
+    cv2.line(image, (int(round(tx)), int(round(ty))), (int(barrel[0]), int(barrel[1])), (200, 200, 200), 2, cv2.LINE_AA)
+    cv2.line(image, (int(barrel[0]), int(barrel[1])), (int(end[0]), int(end[1])), (0, 200, 255), 5, cv2.LINE_AA)
+    perp = angle + math.pi / 2
+    flight = np.array([
+        end,
+        (end[0] + math.cos(angle) * 12 + math.cos(perp) * 8, end[1] + math.sin(angle) * 12 + math.sin(perp) * 8),
+        (end[0] + math.cos(angle) * 12 - math.cos(perp) * 8, end[1] + math.sin(angle) * 12 - math.sin(perp) * 8),
+    ], dtype=np.int32)
+    cv2.fillConvexPoly(image, flight, (255, 60, 0), cv2.LINE_AA)
+
+
+def generate_frame(rng, width=640, height=480, n_darts=3, params=None):
+    """
+    Returns (frame, background, truth). The background is the same board without darts,
+    under the same lighting but independent noise, as a camera would see it.
+    """
+    params = params or random_params(rng, width, height)
+    board, _ = render_board(params, width, height)
+
+    scores = list(rng.choice(DART_SCORES, size=n_darts))
+    board_xy = get_coords_from_scores(scores, seed=rng)
+    tips = board_to_image(board_xy, params)
+
+    with_darts = board.copy()
+    for tip in tips:
+        draw_dart(with_darts, tip, rng)
+
+    background = apply_lighting(board, params, rng)
+    frame = apply_lighting(with_darts, params, rng)
+    truth = {
+        "params": {k: (list(v) if isinstance(v, tuple) else v) for k, v in params.items()},
+        "darts": [{"score": str(s), "tip": [float(x), float(y)]} for s, (x, y) in zip(scores, tips)],
+    }
+    return frame, background, truth
+
+
+def generate_dataset(out_dir, n, seed=0, width=640, height=480):
+    """Writes n frames, their backgrounds and a truth.jsonl file to out_dir."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "truth.jsonl"), "w") as f:
+        for i in range(n):
+            frame, background, truth = generate_frame(rng, width, height)
+            cv2.imwrite(os.path.join(out_dir, f"{i:05d}.png"), frame)
+            cv2.imwrite(os.path.join(out_dir, f"{i:05d}_bg.png"), background)
+            truth["frame"] = f"{i:05d}.png"
+            f.write(json.dumps(truth) + "\n")
+
+
+def benchmark_detectors(n, seed=0, width=640, height=480):
+    """Times and scores auto_detect_board and detect_darts from debug_camera on synthetic frames."""
+    from debug_camera import auto_detect_board, detect_darts
+
+    rng = np.random.default_rng(seed)
+    board_time = dart_time = 0.0
+    board_found = 0
+    center_err = []
+    radius_err = []
+    darts_total = darts_found = 0
+    tip_err = []
+
+    for _ in range(n):
+        frame, background, truth = generate_frame(rng, width, height)
+        params = truth["params"]
+
+        start = time.perf_counter()
+        center, radius, _, _ = auto_detect_board(frame)
+        board_time += time.perf_counter() - start
+        if center is not None:
+            board_found += 1
+            center_err.append(math.dist(center, params["center"]))
+            radius_err.append(abs(radius - params["board_radius"]) / params["board_radius"])
+
+        start = time.perf_counter()
+        detections = detect_darts(frame, background)
+        dart_time += time.perf_counter() - start
+        points = [p for _, p in detections]
+        for dart in truth["darts"]:
+            darts_total += 1
+            if points:
+                d = min(math.dist(p, dart["tip"]) for p in points)
+                tip_err.append(d)
+                if d < params["board_radius"] * 0.1:
+                    darts_found += 1
+
+    return {
+        "frames": n,
+        "auto_detect_ms": board_time / n * 1000,
+        "auto_detect_rate": board_found / n,
+        "center_error_px": float(np.median(center_err)) if center_err else None,
+        "radius_error": float(np.median(radius_err)) if radius_err else None,
+        "detect_darts_ms": dart_time / n * 1000,
+        "dart_recall": darts_found / darts_total if darts_total else 0.0,
+        "tip_error_px": float(np.median(tip_err)) if tip_err else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic dartboard frames with known ground truth")
+    parser.add_argument("-n", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--out", help="Write frames and truth.jsonl to this directory")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    if args.out:
+        generate_dataset(args.out, args.n, args.seed, width, height)
+        print(f"Wrote {args.n} frames to {args.out}")
+    else:
+        for k, v in benchmark_detectors(args.n, args.seed, width, height).items():
+            print(f"{k}: {v:.3f}" if isinstance(v, float) else f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
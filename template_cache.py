@@ -0,0 +1,53 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache store, "name", key... %}...{% endcache %} renders the body once and reuses
+    the HTML while the key stays the same. store is a dict owned by whatever the
+    fragment shows (e.g. Match.fragments), holding the latest version of each named
+    fragment, so it never outgrows the page. The key must cover everything the body
+    depends on, typically version counters.
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        store = parser.parse_expression()
+        parser.stream.expect("comma")
+        name = parser.parse_expression()
+        key = []
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cached", [store, name, nodes.List(key)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cached(self, store, name, key, caller):
+        key = tuple(key)
+        entry = store.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        html = caller()
+        store[name] = (key, html)
+        return html
+
+
+def init_app(app):
+    """
+    Adds {% cache %} and a persistent bytecode cache, and loads every template up
+    front, so a new worker reads compiled templates from disk instead of compiling
+    them on its first requests. The cache lives in JINJA_CACHE_DIR, or a per-user
+    directory under the system temp dir.
+    """
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    directory = os.environ.get("JINJA_CACHE_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
@@ -0,0 +1,241 @@
+import threading
+import uuid
+
+FORMATS = ("round_robin", "knockout")
+
+
+class Standing:
+    """One player's running totals, updated as each leg and match finishes."""
+
+    def __init__(self, player):
+        self.player = player
+        self.played = 0
+        self.won = 0
+        self.legs_won = 0
+        self.legs_lost = 0
+        self.darts = 0
+        self.points = 0
+        self.one80s = 0
+        self.highest_visit = 0
+        self.checkout_attempts = 0
+        self.checkouts_hit = 0
+
+    def add_leg(self, stats):
+        """Folds in one leg's player_history.leg_stats."""
+        if stats["won"]:
+            self.legs_won += 1
+        else:
+            self.legs_lost += 1
+        self.darts += stats["darts"]
+        self.points += stats["points"]
+        self.one80s += stats["one80s"]
+        self.highest_visit = max(self.highest_visit, stats["highest_visit"])
+        self.checkout_attempts += stats["checkout_attempts"]
+        self.checkouts_hit += stats["checkouts_hit"]
+
+    @property
+    def lost(self):
+        return self.played - self.won
+
+    @property
+    def leg_difference(self):
+        return self.legs_won - self.legs_lost
+
+    @property
+    def average(self):
+        return self.points / self.darts * 3 if self.darts else 0.0
+
+    @property
+    def checkout_percentage(self):
+        return self.checkouts_hit / self.checkout_attempts * 100 if self.checkout_attempts else 0.0
+
+
+class Fixture:
+    """A match between two players (a slot is None until a knockout feeder decides it)."""
+
+    def __init__(self, fixture_id, round_no, players):
+        self.id = fixture_id
+        self.round = round_no
+        self.players = list(players)
+        self.status = "pending"   # pending, live, done
+        self.board = None
+        self.game_id = None
+        self.legs = {}
+        self.winner = None
+        self.next = None          # (fixture, slot) the winner moves on to, in a knockout
+
+    @property
+    def ready(self):
+        return self.status == "pending" and None not in self.players
+
+
+def round_robin_rounds(players):
+    """Every pairing once, grouped into rounds by the circle method (an odd field gets a bye each round)."""
+    field = list(players) + ([None] if len(players) % 2 else [])
+    n = len(field)
+    rounds = []
+    for _ in range(n - 1):
+        pairs = [(field[i], field[n - 1 - i]) for i in range(n // 2)]
+        rounds.append([pair for pair in pairs if None not in pair])
+        field.insert(1, field.pop())
+    return rounds
+
+
+class Tournament:
+    """
+    Fixtures for a set of players spread over several boards. Whenever a board is
+    free it gets the earliest fixture that is ready and whose players aren't on
+    another board; start_match(tournament, fixture) creates the match for it and
+    returns its game id. Match results come in leg by leg through record_leg, which
+    updates the standings in place and, once a fixture is decided, advances the
+    knockout and puts the next fixture on the freed board straight away.
+    """
+
+    def __init__(self, name, players, boards, start_match, fmt="round_robin", best_of=1, start_score=501):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        players = list(dict.fromkeys(players))
+        if len(players) < 2:
+            raise ValueError("A tournament needs at least two different players")
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.format = fmt
+        self.players = players
+        self.best_of = int(best_of)
+        self.legs_needed = self.best_of // 2 + 1
+        self.start_score = start_score
+        self.start_match = start_match
+        self.boards = [None] * max(1, int(boards))   # fixture on each board
+        self.standings = {p: Standing(p) for p in players}
+        self.fixtures = []
+        self.lock = threading.RLock()
+        self.version = 0
+        self._leaderboard = None
+
+        if fmt == "round_robin":
+            for round_no, pairs in enumerate(round_robin_rounds(players), 1):
+                for pair in pairs:
+                    self._add_fixture(round_no, pair)
+        else:
+            self._build_knockout()
+
+    def _add_fixture(self, round_no, players):
+        fixture = Fixture(len(self.fixtures), round_no, players)
+        self.fixtures.append(fixture)
+        return fixture
+
+    def _build_knockout(self):
+        size = 1 << (len(self.players) - 1).bit_length()
+        seeds = self.players + [None] * (size - len(self.players))
+        # Top seeds meet the byes (None) in the first round
+        current = [self._add_fixture(1, (seeds[i], seeds[size - 1 - i])) for i in range(size // 2)]
+        round_no = 1
+        while len(current) > 1:
+            round_no += 1
+            following = []
+            for i in range(0, len(current), 2):
+                fixture = self._add_fixture(round_no, (None, None))
+                current[i].next = (fixture, 0)
+                current[i + 1].next = (fixture, 1)
+                following.append(fixture)
+            current = following
+        for fixture in self.fixtures:
+            if fixture.round == 1 and None in fixture.players:
+                self._finish(fixture, next(p for p in fixture.players if p is not None), bye=True)
+
+    @property
+    def finished(self):
+        return all(f.status == "done" for f in self.fixtures)
+
+    @property
+    def champion(self):
+        if self.format == "knockout" and self.finished:
+            return self.fixtures[-1].winner
+        return None
+
+    def schedule(self):
+        """Starts ready fixtures on every free board. Returns the fixtures started."""
+        started = []
+        with self.lock:
+            busy = {p for f in self.boards if f is not None for p in f.players}
+            for board, current in enumerate(self.boards):
+                if current is not None:
+                    continue
+                fixture = next((f for f in self.fixtures if f.ready and busy.isdisjoint(f.players)), None)
+                if fixture is None:
+                    break
+                fixture.status = "live"
+                fixture.board = board
+                # An abandoned fixture carries on from the legs it had already won
+                fixture.legs = fixture.legs or {p: 0 for p in fixture.players}
+                fixture.game_id = self.start_match(self, fixture)
+                self.boards[board] = fixture
+                busy.update(fixture.players)
+                started.append(fixture)
+            if started:
+                self.version += 1
+        return started
+
+    def record_leg(self, fixture_id, legs):
+        """
+        Folds a finished leg (player_history.leg_stats for each player) into the
+        standings and the fixture's score, finishing the fixture once someone has
+        won enough legs.
+        """
+        with self.lock:
+            fixture = self.fixtures[fixture_id]
+            if fixture.status != "live":
+                return
+            winner = None
+            for stats in legs:
+                self.standings[stats["player"]].add_leg(stats)
+                if stats["won"]:
+                    winner = stats["player"]
+                    fixture.legs[winner] += 1
+            self._leaderboard = None
+            self.version += 1
+            if winner is not None and fixture.legs[winner] >= self.legs_needed:
+                self._finish(fixture, winner)
+                self.schedule()
+
+    def abandon(self, fixture_id):
+        """
+        Takes a live fixture whose match has gone off its board and puts it back in
+        the queue, keeping its leg score, then fills the freed board.
+        """
+        with self.lock:
+            fixture = self.fixtures[fixture_id]
+            if fixture.status != "live":
+                return
+            self.boards[fixture.board] = None
+            fixture.status = "pending"
+            fixture.board = None
+            fixture.game_id = None
+            self.version += 1
+            self.schedule()
+
+    def _finish(self, fixture, winner, bye=False):
+        fixture.status = "done"
+        fixture.winner = winner
+        if fixture.board is not None:
+            self.boards[fixture.board] = None
+        if not bye:
+            for player in fixture.players:
+                standing = self.standings[player]
+                standing.played += 1
+                if player == winner:
+                    standing.won += 1
+        if fixture.next is not None:
+            following, slot = fixture.next
+            following.players[slot] = winner
+        self._leaderboard = None
+        self.version += 1
+
+    def leaderboard(self):
+        """Standings, best first: matches won, then leg difference, then average. Sorted again only after a change."""
+        with self.lock:
+            if self._leaderboard is None:
+                self._leaderboard = sorted(
+                    self.standings.values(),
+                    key=lambda s: (-s.won, -s.leg_difference, -s.average, s.player))
+            return self._leaderboard